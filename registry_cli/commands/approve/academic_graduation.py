@@ -1,9 +1,9 @@
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 import click
 from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 from registry_cli.grade_definitions import is_failing_grade as grade_is_failing
 from registry_cli.grade_definitions import is_passing_grade as grade_is_passing
@@ -22,8 +22,12 @@ from registry_cli.models import (
     Student,
     StudentModule,
     StudentProgram,
+    StudentSemester,
 )
 
+# Maximum number of ids bound into a single IN (...) filter
+IN_BATCH_SIZE = 500
+
 
 def normalize_grade_symbol(grade: str) -> str:
     """
@@ -134,8 +138,18 @@ def normalize_module_name(name: str) -> str:
 def get_student_programs(db: Session, std_no: int) -> List[StudentProgram]:
     """
     Get student programs for a given student number.
+
+    Semesters and their modules are eager loaded, since extract_data walks
+    them for every program it picks.
     """
-    programs = db.query(StudentProgram).filter(StudentProgram.std_no == std_no).all()
+    programs = (
+        db.query(StudentProgram)
+        .options(
+            selectinload(StudentProgram.semesters).selectinload(StudentSemester.modules)
+        )
+        .filter(StudentProgram.std_no == std_no)
+        .all()
+    )
     return programs
 
 
@@ -236,6 +250,81 @@ def extract_data(programs: List[StudentProgram]) -> Dict[str, Any]:
     return {"studentModules": student_modules, "semesters": filtered_semesters}
 
 
+def _select_outstanding_program(
+    programs: List[StudentProgram],
+) -> Optional[StudentProgram]:
+    """
+    Pick the program outstanding modules are checked against: the active
+    program, otherwise the latest completed one.
+    """
+    for p in programs:
+        if p.status == "Active":
+            return p
+
+    # Try to get the latest completed program
+    completed_programs = [p for p in programs if p.status == "Completed"]
+    if completed_programs:
+        # Sort by created_at descending to get the latest
+        completed_programs.sort(key=lambda x: x.created_at or "", reverse=True)
+        return completed_programs[0]
+
+    return None
+
+
+def _required_module(
+    module: Module, module_type: Any, credits: Any, semester_number: int
+) -> Dict[str, Any]:
+    """
+    Build the required-module entry compared against a student's attempts.
+    """
+    return {
+        "id": module.id,
+        "code": module.code,
+        "name": normalize_module_name(module.name),
+        "originalName": module.name,
+        "type": module_type,
+        "credits": credits,
+        "semesterNumber": semester_number,
+    }
+
+
+def _find_outstanding(
+    required_modules: List[Dict[str, Any]],
+    attempted_modules: Dict[str, List[StudentModule]],
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Split required modules into failed never repeated and never attempted,
+    given the student's attempts keyed by normalized module name.
+    """
+    failed_never_repeated = []
+    never_attempted = []
+
+    for module in required_modules:
+        attempts = attempted_modules.get(module["name"], [])
+
+        if not attempts:
+            # Never attempted
+            never_attempted.append({**module, "name": module["originalName"]})
+        else:
+            # Check if any attempt passed
+            passed_attempts = [
+                attempt for attempt in attempts if is_passing_grade(attempt.grade or "")
+            ]
+
+            if not passed_attempts:
+                # All attempts failed
+                if len(attempts) == 1:
+                    # Failed and never repeated
+                    failed_never_repeated.append(
+                        {**module, "name": module["originalName"]}
+                    )
+
+    return {
+        "failedNeverRepeated": failed_never_repeated,
+        "neverAttempted": never_attempted,
+    }
+
+
 def get_outstanding_from_structure(
     db: Session, programs: List[StudentProgram]
 ) -> Dict[str, List[Dict[str, Any]]]:
@@ -244,19 +333,7 @@ def get_outstanding_from_structure(
     Returns failed never repeated and never attempted modules.
     """
     # Find active program first, if not found get latest completed program
-    program = None
-    for p in programs:
-        if p.status == "Active":
-            program = p
-            break
-
-    if not program:
-        # Try to get the latest completed program
-        completed_programs = [p for p in programs if p.status == "Completed"]
-        if completed_programs:
-            # Sort by created_at descending to get the latest
-            completed_programs.sort(key=lambda x: x.created_at or "", reverse=True)
-            program = completed_programs[0]
+    program = _select_outstanding_program(programs)
 
     if not program:
         raise Exception("No active or completed program found for student")
@@ -272,15 +349,12 @@ def get_outstanding_from_structure(
                 "hidden", False
             ):  # Ensure module exists and is not hidden
                 required_modules.append(
-                    {
-                        "id": sm["module"].id,
-                        "code": sm["module"].code,
-                        "name": normalize_module_name(sm["module"].name),
-                        "originalName": sm["module"].name,
-                        "type": sm["type"],
-                        "credits": sm["credits"],
-                        "semesterNumber": semester["semesterNumber"],
-                    }
+                    _required_module(
+                        sm["module"],
+                        sm["type"],
+                        sm["credits"],
+                        semester["semesterNumber"],
+                    )
                 )
 
     # Extract student modules using improved logic
@@ -304,33 +378,129 @@ def get_outstanding_from_structure(
                     attempted_modules[name] = []
                 attempted_modules[name].append(sm)
 
-    failed_never_repeated = []
-    never_attempted = []
+    return _find_outstanding(required_modules, attempted_modules)
 
-    for module in required_modules:
-        attempts = attempted_modules.get(module["name"], [])
 
-        if not attempts:
-            # Never attempted
-            never_attempted.append({**module, "name": module["originalName"]})
-        else:
-            # Check if any attempt passed
-            passed_attempts = [
-                attempt for attempt in attempts if is_passing_grade(attempt.grade or "")
-            ]
+def get_outstanding_from_structure_bulk(
+    db: Session, std_nos: Iterable[int]
+) -> Dict[int, Dict[str, List[Dict[str, Any]]]]:
+    """
+    Get outstanding modules for many students at once.
+
+    Same rules as get_outstanding_from_structure, but programs, structure
+    modules and attempted modules are loaded with a few IN-filtered queries
+    for the whole batch instead of several queries per student. Students with
+    no active or completed program are left out of the result, as are students
+    whose modules raise an error; the error is reported and the rest of the
+    batch carries on.
+    """
+    std_no_list = list(dict.fromkeys(std_nos))
+
+    # Programs with their semesters and modules, grouped by student
+    programs_by_std_no: Dict[int, List[StudentProgram]] = {}
+    for start in range(0, len(std_no_list), IN_BATCH_SIZE):
+        batch = std_no_list[start : start + IN_BATCH_SIZE]
+        programs = (
+            db.query(StudentProgram)
+            .options(
+                selectinload(StudentProgram.semesters).selectinload(
+                    StudentSemester.modules
+                )
+            )
+            .filter(StudentProgram.std_no.in_(batch))
+            .order_by(StudentProgram.id)
+            .all()
+        )
+        for program in programs:
+            programs_by_std_no.setdefault(program.std_no, []).append(program)
+
+    target_programs: Dict[int, StudentProgram] = {}
+    for std_no, programs in programs_by_std_no.items():
+        program = _select_outstanding_program(programs)
+        if program:
+            target_programs[std_no] = program
+
+    # Required (visible) modules, built once per structure
+    structure_ids = list({p.structure_id for p in target_programs.values()})
+    required_by_structure: Dict[int, List[Dict[str, Any]]] = {
+        structure_id: [] for structure_id in structure_ids
+    }
+    for start in range(0, len(structure_ids), IN_BATCH_SIZE):
+        batch = structure_ids[start : start + IN_BATCH_SIZE]
+        rows = (
+            db.query(
+                StructureSemester.structure_id,
+                StructureSemester.semester_number,
+                SemesterModule,
+            )
+            .join(SemesterModule, SemesterModule.semester_id == StructureSemester.id)
+            .options(joinedload(SemesterModule.module))
+            .filter(
+                and_(
+                    StructureSemester.structure_id.in_(batch),
+                    SemesterModule.hidden == False,  # Only get visible modules
+                )
+            )
+            .order_by(
+                StructureSemester.structure_id,
+                StructureSemester.semester_number,
+                StructureSemester.id,
+                SemesterModule.id,
+            )
+            .all()
+        )
+        for structure_id, semester_number, sm in rows:
+            if sm.module:  # Ensure module exists
+                required_by_structure[structure_id].append(
+                    _required_module(sm.module, sm.type, sm.credits, semester_number)
+                )
 
-            if not passed_attempts:
-                # All attempts failed
-                if len(attempts) == 1:
-                    # Failed and never repeated
-                    failed_never_repeated.append(
-                        {**module, "name": module["originalName"]}
-                    )
+    # Attempted modules for every student, then their module names in one pass
+    student_modules_by_std_no: Dict[int, List[StudentModule]] = {}
+    for std_no in target_programs:
+        try:
+            student_modules_by_std_no[std_no] = extract_data(
+                programs_by_std_no[std_no]
+            )["studentModules"]
+        except Exception as e:
+            click.echo(f"Error checking pending issues for student {std_no}: {str(e)}")
+    semester_module_ids = list(
+        {
+            sm.semester_module_id
+            for student_modules in student_modules_by_std_no.values()
+            for sm in student_modules
+            if sm.semester_module_id
+        }
+    )
+    module_names: Dict[int, str] = {}
+    for start in range(0, len(semester_module_ids), IN_BATCH_SIZE):
+        batch = semester_module_ids[start : start + IN_BATCH_SIZE]
+        rows = (
+            db.query(SemesterModule.id, Module.name)
+            .join(Module, SemesterModule.module_id == Module.id)
+            .filter(SemesterModule.id.in_(batch))
+            .all()
+        )
+        for semester_module_id, name in rows:
+            module_names[semester_module_id] = normalize_module_name(name)
 
-    return {
-        "failedNeverRepeated": failed_never_repeated,
-        "neverAttempted": never_attempted,
-    }
+    outstanding_by_std_no: Dict[int, Dict[str, List[Dict[str, Any]]]] = {}
+    for std_no, student_modules in student_modules_by_std_no.items():
+        program = target_programs[std_no]
+        try:
+            attempted_modules: Dict[str, List[StudentModule]] = {}
+            for sm in student_modules:
+                name = module_names.get(sm.semester_module_id)
+                if name is not None:
+                    attempted_modules.setdefault(name, []).append(sm)
+
+            outstanding_by_std_no[std_no] = _find_outstanding(
+                required_by_structure[program.structure_id], attempted_modules
+            )
+        except Exception as e:
+            click.echo(f"Error checking pending issues for student {std_no}: {str(e)}")
+
+    return outstanding_by_std_no
 
 
 def process_academic_clearance(
@@ -436,6 +606,9 @@ def approve_academic_graduation(db: Session) -> None:
     approved_count = 0
     failed_count = 0
 
+    # Outstanding modules per student for this run (None when no programs)
+    outstanding_by_std_no: Dict[int, Optional[Dict[str, List[Dict[str, Any]]]]] = {}
+
     for i, (graduation_request, std_no) in enumerate(pending_academic_requests, 1):
         click.echo(
             f"\nProcessing {i}/{len(pending_academic_requests)}: Student {std_no}"
@@ -467,9 +640,18 @@ def approve_academic_graduation(db: Session) -> None:
                 failed_count += 1
                 continue
 
-            # Get student programs and check academic requirements
-            programs = get_student_programs(db, std_no)
-            if not programs:
+            # Get student programs and check academic requirements, once per
+            # student even when they have several pending requests
+            if std_no in outstanding_by_std_no:
+                outstanding = outstanding_by_std_no[std_no]
+            else:
+                programs = get_student_programs(db, std_no)
+                outstanding = (
+                    get_outstanding_from_structure(db, programs) if programs else None
+                )
+                outstanding_by_std_no[std_no] = outstanding
+
+            if outstanding is None:
                 click.secho(
                     f"  ✗ No programs found for student {std_no}",
                     fg="red",
@@ -477,8 +659,6 @@ def approve_academic_graduation(db: Session) -> None:
                 failed_count += 1
                 continue
 
-            outstanding = get_outstanding_from_structure(db, programs)
-
             # Check if requirements are met
             if (
                 len(outstanding["failedNeverRepeated"]) == 0
@@ -173,8 +173,8 @@ def _export_certificates_to_excel(programs: dict) -> str:
     # Issue date for all certificates
     issue_date = "02 October 2025"
 
-    # Write data rows
-    row = 2
+    # Write data rows, tracking each column's widest value as they go
+    col_widths = [len(header) for header in headers]
 
     # Sort programs by program name for consistent ordering
     sorted_programs = sorted(programs.items(), key=lambda x: x[1]["program_name"])
@@ -190,25 +190,22 @@ def _export_certificates_to_excel(programs: dict) -> str:
             )
 
             # Write row data
-            ws.cell(row=row, column=1, value=reference)
-            ws.cell(row=row, column=2, value=student["student_name"])
-            ws.cell(row=row, column=3, value=student["program_name"])
-            ws.cell(row=row, column=4, value=issue_date)
-
-            row += 1
+            row_values = (
+                reference,
+                student["student_name"],
+                student["program_name"],
+                issue_date,
+            )
+            ws.append(row_values)
+            for i, value in enumerate(row_values):
+                length = len(value) if isinstance(value, str) else len(str(value))
+                if length > col_widths[i]:
+                    col_widths[i] = length
 
     # Auto-adjust column widths
-    for col in range(1, len(headers) + 1):
-        column_letter = get_column_letter(col)
-        max_length = 0
-        for cell in ws[column_letter]:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
+    for col, width in enumerate(col_widths, 1):
+        adjusted_width = min(width + 2, 50)
+        ws.column_dimensions[get_column_letter(col)].width = adjusted_width
 
     # Save the workbook
     wb.save(excel_path)
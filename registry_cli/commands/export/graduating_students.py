@@ -1,16 +1,36 @@
+import csv
 import os
+import re
+import time
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from itertools import groupby
+from operator import itemgetter
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
 
 import click
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.utils import get_column_letter
-from sqlalchemy import and_, or_
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.orm import Session, selectinload
 
 from registry_cli.commands.approve.academic_graduation import (
+    IN_BATCH_SIZE,
     get_outstanding_from_structure,
+    get_outstanding_from_structure_bulk,
     get_student_programs,
 )
 from registry_cli.grade_definitions import calculate_cgpa_from_semesters
@@ -27,6 +47,453 @@ from registry_cli.models import (
     StudentProgram,
     StudentSemester,
 )
+from registry_cli.utils.excel import (
+    BLACK_FILL,
+    BOLD_GREY,
+    BOLD_WHITE,
+    GREY_FILL,
+    styled_cell,
+    warn_if_no_lxml,
+)
+
+T = TypeVar("T")
+
+# Minimum number of seconds between progress messages in long loops
+PROGRESS_INTERVAL_SECONDS = 2.0
+
+# Semester and module statuses that never count towards graduation or CGPA
+EXCLUDED_SEMESTER_STATUSES = ("Deleted", "Deferred", "DroppedOut", "Withdrawn")
+EXCLUDED_MODULE_STATUSES = ("Delete", "Drop")
+
+# Minimum rounded CGPA for each classification above "Failed", in ascending
+# order so a CGPA's classification is found by bisecting the thresholds
+CLASSIFICATION_THRESHOLDS = (
+    1.7,  # C+, C, C- range (Pass)
+    3.0,  # B+, B, B- range (Pass with Merit)
+    3.5,  # A+, A, A- range (Pass with Distinction)
+)
+CLASSIFICATIONS = ("Failed", "Pass", "Merit", "Distinction")
+
+GRADUATING_HEADERS = (
+    "Student Number",
+    "Student Name",
+    "School Name",
+    "Program Name",
+    "CGPA",
+    "Classification",
+    "Criteria Met",
+)
+# Values of a graduating student in GRADUATING_HEADERS order
+GRADUATING_ROW = itemgetter(
+    "student_number",
+    "student_name",
+    "school_name",
+    "program_name",
+    "cgpa",
+    "classification",
+    "criteria_met",
+)
+NON_GRADUATING_HEADERS = (
+    "Student Number",
+    "Student Name",
+    "School Name",
+    "Program Name",
+    "Program Level",
+    "Criteria",
+    "Failed Never Repeated",
+    "Never Attempted",
+)
+NON_GRADUATING_HEADER_WIDTHS = tuple(len(header) for header in NON_GRADUATING_HEADERS)
+
+SEGMENT_INDEX_HEADERS = ("School Name", "Graduating Students", "File")
+
+# Above this many graduating students a CSV copy of the list is written next
+# to the workbook unless an export format is explicitly chosen
+CSV_EXPORT_THRESHOLD = 5000
+
+# Above this many graduating students the export is split into one workbook
+# per school unless segmentation is explicitly chosen or turned off
+SEGMENT_BY_SCHOOL_THRESHOLD = 10000
+
+# Widest a float (e.g. a CGPA) may make its column, in characters
+FLOAT_WIDTH_CAP = 8
+
+# Column letters for the handful of columns the export sheets use, indexed from 1
+COLUMN_LETTERS = [None] + [get_column_letter(idx) for idx in range(1, 27)]
+
+
+def _with_progress(items: Sequence[T], message: str) -> Iterator[T]:
+    """
+    Iterate over items, echoing progress at most every PROGRESS_INTERVAL_SECONDS.
+
+    The message is a format string receiving the current index and the total,
+    and is only formatted when a progress line is actually printed.
+    """
+    total = len(items)
+    last_progress = time.monotonic()
+    for index, item in enumerate(items, 1):
+        now = time.monotonic()
+        if now - last_progress >= PROGRESS_INTERVAL_SECONDS:
+            click.echo(message.format(index, total))
+            last_progress = now
+        yield item
+
+
+def _display_width(value) -> int:
+    """
+    Number of characters a cell value needs in its column; None needs none.
+
+    Strings are measured as they are, and floats are capped at
+    FLOAT_WIDTH_CAP so a long fraction cannot blow up a column's width.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, float):
+        return min(len(str(value)), FLOAT_WIDTH_CAP)
+    return len(str(value))
+
+
+def _write_hierarchical_sheet(
+    ws,
+    graduation_stats: Dict,
+    value_columns: Sequence[Tuple[str, Callable[[Dict], object]]],
+    include: Optional[Callable[[Dict], bool]] = None,
+) -> None:
+    """
+    Write a school/program summary from graduation_stats to a write-only sheet.
+
+    Each school gets a shaded header row, one row per program and a total row,
+    followed by a grand total. value_columns holds a (header, getter) pair for
+    every column after School/Faculty and Program; the getter maps a stats dict
+    to the cell value. Schools and programs whose stats fail include are skipped.
+    graduation_stats is expected to be sorted by school and program already.
+    """
+    school_program_stats = graduation_stats["school_program_stats"]
+    school_totals = graduation_stats["school_totals"]
+    overall_stats = graduation_stats["overall_stats"]
+
+    headers = ["School/Faculty", "Program"] + [header for header, _ in value_columns]
+    getters = [getter for _, getter in value_columns]
+
+    schools = [
+        school
+        for school in school_program_stats
+        if include is None or include(school_totals[school])
+    ]
+    # Lay each school's programs out column-wise: one list of names and one
+    # list per value column, so every getter runs once per program and the
+    # widths are taken straight from the column lists
+    program_names = {}
+    program_columns = {}
+    for school in schools:
+        included = [
+            (program, stats)
+            for program, stats in school_program_stats[school].items()
+            if include is None or include(stats)
+        ]
+        program_names[school] = [program for program, _ in included]
+        program_columns[school] = [
+            [getter(stats) for _, stats in included] for getter in getters
+        ]
+    school_values = {
+        school: [getter(school_totals[school]) for getter in getters]
+        for school in schools
+    }
+    grand_values = [getter(overall_stats) for getter in getters]
+
+    # Column widths, taken from the headers, labels and values up front
+    widths = [
+        max(map(len, [headers[0], *schools])),
+        max(
+            map(
+                len,
+                [
+                    headers[1],
+                    "Total",
+                    "GRAND TOTAL",
+                    *(
+                        program
+                        for school in schools
+                        for program in program_names[school]
+                    ),
+                ],
+            )
+        ),
+    ]
+    for col_index, header in enumerate(headers[2:]):
+        column_values = [grand_values[col_index]]
+        for school in schools:
+            column_values.extend(program_columns[school][col_index])
+            column_values.append(school_values[school][col_index])
+        widths.append(max(len(header), *map(_display_width, column_values)))
+    for idx, width in enumerate(widths, 1):
+        ws.column_dimensions[COLUMN_LETTERS[idx]].width = min(width + 2, 60)
+
+    # Local aliases keep the per-row calls below off the attribute/global path
+    append = ws.append
+    bold_white, bold_grey = BOLD_WHITE, BOLD_GREY
+
+    append([styled_cell(ws, header, bold_white, BLACK_FILL) for header in headers])
+
+    # Only the first cell of a school header row is written and styled; it is
+    # merged across the other columns, which show its fill. Write-only sheets
+    # do not track rows, so the row number is counted here.
+    last_column = COLUMN_LETTERS[len(headers)]
+    row = 1
+
+    for school in schools:
+        # School header row spanning all columns
+        row += 1
+        append([styled_cell(ws, school, bold_white, GREY_FILL)])
+        ws.merged_cells.add(f"A{row}:{last_column}{row}")
+
+        for row_values in zip(program_names[school], *program_columns[school]):
+            append(["", *row_values])  # Indent for program
+        row += len(program_names[school]) + 2  # Programs, total and spacer
+
+        append(
+            [None, styled_cell(ws, "Total", bold_grey)]
+            + [styled_cell(ws, value, bold_grey) for value in school_values[school]]
+        )
+        append([])  # Add space between schools
+
+    append(
+        [None, styled_cell(ws, "GRAND TOTAL", bold_white, BLACK_FILL)]
+        + [styled_cell(ws, value, bold_white, BLACK_FILL) for value in grand_values]
+    )
+
+
+def _format_rate(stats: Dict) -> str:
+    """Format a graduation rate for the statistics sheet."""
+    return f"{stats['percentage']:.1f}%"
+
+
+# Value columns for _write_hierarchical_sheet
+BREAKDOWN_COLUMNS = (("Student Count", itemgetter("graduating")),)
+STATISTICS_COLUMNS = (
+    ("Expected", itemgetter("expected")),
+    ("Graduating", itemgetter("graduating")),
+    ("Non-Graduating", itemgetter("non_graduating")),
+    ("Graduation Rate (%)", _format_rate),
+)
+
+
+def _non_graduating_rows(non_graduating_students: List[Dict]) -> Iterator[Tuple]:
+    """Yield the Non-Graduating Students sheet rows one student at a time."""
+    # Only a handful of program levels exist, so title-case each one once
+    level_titles: Dict[str, str] = {}
+    for student in non_graduating_students:
+        level = student["program_level"]
+        level_title = level_titles.get(level)
+        if level_title is None:
+            level_title = level_titles[level] = level.title()
+
+        yield (
+            student["student_number"],
+            student["student_name"],
+            student["school_name"],
+            student["program_name"],
+            level_title,
+            student.get("criteria", ""),
+            "; ".join(
+                f"{module['code']} - {module['name']}"
+                for module in student["failed_never_repeated"]
+            )
+            or "None",
+            "; ".join(
+                f"{module['code']} - {module['name']}"
+                for module in student["never_attempted"]
+            )
+            or "None",
+        )
+
+
+def _write_graduating_sheet(ws, graduating_students: List[Dict]) -> None:
+    """Write graduating students, one row each, to a write-only sheet."""
+    headers = GRADUATING_HEADERS
+
+    # All rows are built first so each column's width is taken in one pass
+    rows = list(map(GRADUATING_ROW, graduating_students))
+    header_widths = [
+        max(len(header), max(map(_display_width, column), default=0))
+        for header, column in zip(headers, zip(*rows))
+    ]
+
+    for idx, width in enumerate(header_widths, 1):
+        adjusted_width = min(width + 2, 50)
+        ws.column_dimensions[COLUMN_LETTERS[idx]].width = adjusted_width
+
+    ws.append([styled_cell(ws, header, BOLD_WHITE, BLACK_FILL) for header in headers])
+    append = ws.append
+    for row_values in rows:
+        append(row_values)
+
+
+def _school_slug(school_name: str) -> str:
+    """Turn a school name into a lowercase, file-name friendly slug."""
+    return re.sub(r"[^a-z0-9]+", "_", school_name.lower()).strip("_") or "school"
+
+
+def _write_school_workbook(
+    school_name: str, school_students: List[Dict], output_dir: str, timestamp: str
+) -> Tuple[str, int, str]:
+    """
+    Save one school's graduating students to a workbook of its own.
+
+    Runs in a worker process, so it only takes plain, picklable data. Returns a
+    (school name, student count, file name) tuple for the segment index.
+    """
+    filename = f"graduating_students_{_school_slug(school_name)}_{timestamp}.xlsx"
+
+    wb = Workbook(write_only=True)
+    _write_graduating_sheet(wb.create_sheet("Graduating Students"), school_students)
+    wb.save(os.path.join(output_dir, filename))
+
+    return school_name, len(school_students), filename
+
+
+def _write_school_segments(
+    graduating_students: List[Dict], output_dir: str, timestamp: str
+) -> List[Tuple[str, int, str]]:
+    """
+    Save the graduating students of each school to a workbook of its own.
+
+    The workbooks share nothing, and writing them is CPU-bound XML
+    serialization, so they are written in parallel worker processes.
+    graduating_students must already be sorted by school name. Returns a
+    (school name, student count, file name) tuple for every workbook written,
+    in school order.
+    """
+    school_rows = {
+        school_name: list(school_students)
+        for school_name, school_students in groupby(
+            graduating_students, key=itemgetter("school_name")
+        )
+    }
+    if len(school_rows) == 1:
+        return [
+            _write_school_workbook(school_name, rows, output_dir, timestamp)
+            for school_name, rows in school_rows.items()
+        ]
+
+    segments = {}
+    max_workers = min(len(school_rows), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                _write_school_workbook, school_name, rows, output_dir, timestamp
+            ): school_name
+            for school_name, rows in school_rows.items()
+        }
+        for future in as_completed(futures):
+            segment = future.result()
+            segments[futures[future]] = segment
+            click.echo(f"Wrote {os.path.join(output_dir, segment[2])}")
+
+    return [segments[school_name] for school_name in school_rows]
+
+
+def _write_segment_index(ws, segments: List[Tuple[str, int, str]]) -> None:
+    """List the per-school workbooks on a write-only sheet, linking each file."""
+    headers = SEGMENT_INDEX_HEADERS
+    widths = [len(header) for header in headers]
+    for segment in segments:
+        widths = list(map(max, widths, map(_display_width, segment)))
+    for idx, width in enumerate(widths, 1):
+        ws.column_dimensions[COLUMN_LETTERS[idx]].width = min(width + 2, 80)
+
+    ws.append([styled_cell(ws, header, BOLD_WHITE, BLACK_FILL) for header in headers])
+    for school_name, student_count, filename in segments:
+        # The segment workbooks are saved next to this one, so a relative
+        # link opens them wherever the exports folder is copied to
+        file_cell = WriteOnlyCell(ws, value=filename)
+        file_cell.hyperlink = filename
+        ws.append([school_name, student_count, file_cell])
+
+
+def _write_graduating_workbook(
+    output_dir: str,
+    timestamp: str,
+    graduating_students: List[Dict],
+    non_graduating_students: List[Dict],
+    graduation_stats: Dict,
+    segment_by_school: bool,
+) -> str:
+    """
+    Write the graduating students workbook and return its path.
+
+    It holds the graduating students (or, when segmented by school, an index
+    of the per-school workbooks saved next to it), the school and program
+    breakdown, the non-graduating students and the graduation statistics.
+    """
+    excel_filename = f"graduating_students_{timestamp}.xlsx"
+    excel_path = os.path.join(output_dir, excel_filename)
+
+    warn_if_no_lxml()
+
+    wb = Workbook(write_only=True)
+
+    # Segmented exports keep the graduating students in per-school workbooks
+    # and only index them here, next to the summary sheets
+    if segment_by_school:
+        _write_segment_index(
+            wb.create_sheet("Index"),
+            _write_school_segments(graduating_students, output_dir, timestamp),
+        )
+    else:
+        _write_graduating_sheet(
+            wb.create_sheet("Graduating Students"), graduating_students
+        )
+
+    # Create breakdown sheet; programs and schools without graduating students
+    # are not listed here
+    _write_hierarchical_sheet(
+        wb.create_sheet("School & Program Breakdown"),
+        graduation_stats,
+        BREAKDOWN_COLUMNS,
+        include=lambda stats: stats["graduating"] > 0,
+    )
+
+    # Create non-graduating students sheet
+    if non_graduating_students:
+        non_grad_ws = wb.create_sheet("Non-Graduating Students")
+
+        non_grad_headers = NON_GRADUATING_HEADERS
+
+        # Rows are generated twice (widths, then writing) rather than held in
+        # a list, so memory stays flat however many students are listed.
+        non_grad_widths = list(NON_GRADUATING_HEADER_WIDTHS)
+        for row_values in _non_graduating_rows(non_graduating_students):
+            non_grad_widths = list(
+                map(max, non_grad_widths, map(_display_width, row_values))
+            )
+
+        for idx, width in enumerate(non_grad_widths, 1):
+            adjusted_width = min(width + 2, 80)
+            non_grad_ws.column_dimensions[COLUMN_LETTERS[idx]].width = adjusted_width
+
+        non_grad_ws.append(
+            [
+                styled_cell(non_grad_ws, header, BOLD_WHITE, BLACK_FILL)
+                for header in non_grad_headers
+            ]
+        )
+        append = non_grad_ws.append
+        for row_values in _non_graduating_rows(non_graduating_students):
+            append(row_values)
+
+    # Create graduation statistics sheet
+    _write_hierarchical_sheet(
+        wb.create_sheet("Graduation Statistics"),
+        graduation_stats,
+        STATISTICS_COLUMNS,
+    )
+
+    # Save the file
+    wb.save(excel_path)
+    return excel_path
 
 
 def has_no_pending_issues(db: Session, std_no: int) -> bool:
@@ -98,18 +565,21 @@ def get_students_expected_to_graduate(
     )
 
     expected_years = {"certificate": 1, "diploma": 3, "degree": 4}
-
-    for level, years in expected_years.items():
-        # Skip levels not in the specified program_levels
-        if level not in program_levels:
-            continue
-
-        target_year = graduation_year - years
-
+    selected_levels = [level for level in expected_years if level in program_levels]
+
+    # Single query across all selected levels. Each level's reg_date year is
+    # matched in SQL so only candidates are fetched, and rows come ordered by
+    # level so a later level overwrites an earlier one as the rows stream in.
+    # Students found per level are counted as they are added to the map.
+    level_counts: Counter = Counter()
+    if selected_levels:
+        level_order = case(
+            {level: index for index, level in enumerate(selected_levels)},
+            value=Program.level,
+        )
         students_query = (
             db.query(
                 StudentProgram.std_no,
-                StudentProgram.reg_date,
                 Program.level.label("program_level"),
                 Program.name.label("program_name"),
                 School.name.label("school_name"),
@@ -122,30 +592,43 @@ def get_students_expected_to_graduate(
             .filter(
                 and_(
                     StudentProgram.status.in_(["Active", "Completed"]),
-                    Program.level == level,
-                    StudentProgram.reg_date.isnot(None),
+                    or_(
+                        *(
+                            and_(
+                                Program.level == level,
+                                StudentProgram.reg_date.like(
+                                    f"{graduation_year - expected_years[level]}-%"
+                                ),
+                            )
+                            for level in selected_levels
+                        )
+                    ),
                 )
             )
-            .all()
+            .order_by(level_order)
+            .yield_per(2000)
         )
 
-        # Filter by year only (not full date)
         for student_data in students_query:
-            if student_data.reg_date:
-                reg_year = int(student_data.reg_date.split("-")[0])
-                if reg_year == target_year:
-                    expected_students_map[student_data.std_no] = {
-                        "std_no": student_data.std_no,
-                        "student_name": student_data.student_name,
-                        "school_name": student_data.school_name,
-                        "program_name": student_data.program_name,
-                        "program_level": student_data.program_level,
-                        "criteria": f"Reg date year {target_year} ({level}, {years} years)",
-                    }
+            level = student_data.program_level
+            existing = expected_students_map.get(student_data.std_no)
+            if existing is None or existing["program_level"] != level:
+                level_counts[level] += 1
+            years = expected_years[level]
+            # Rows already match the target year (not full date)
+            expected_students_map[student_data.std_no] = {
+                "std_no": student_data.std_no,
+                "student_name": student_data.student_name,
+                "school_name": student_data.school_name,
+                "program_name": student_data.program_name,
+                "program_level": level,
+                "criteria": f"Reg date year {graduation_year - years} ({level}, {years} years)",
+            }
 
+    for level in selected_levels:
+        target_year = graduation_year - expected_years[level]
         click.echo(
-            f"Found {sum(1 for s in expected_students_map.values() if s['program_level'] == level)} "
-            f"{level} students with reg_date year {target_year}"
+            f"Found {level_counts[level]} {level} students with reg_date year {target_year}"
         )
 
     # Method 2: Based on completion terms
@@ -153,11 +636,12 @@ def get_students_expected_to_graduate(
         f"Finding students with completion terms: {', '.join(completion_terms)}..."
     )
 
-    # Define semester requirements by level
+    # Define semester requirements by level as bitmasks (bit n = semester n),
+    # each level listing the alternative masks that satisfy it
     semester_requirements = {
-        "certificate": {1, 2},
-        "diploma": {1, 2, 3, 4, 5, 6},
-        "degree": [{1, 2, 3, 4, 5, 6, 7, 8}, {6, 7, 8}],  # Either full 8 or last 3
+        "certificate": [0b110],  # Semesters 1-2
+        "diploma": [0b1111110],  # Semesters 1-6
+        "degree": [0b111111110, 0b111000000],  # Either full 8 or last 3 (6-8)
     }
 
     # Get all students with the specified terms and program levels
@@ -190,6 +674,30 @@ def get_students_expected_to_graduate(
         f"Found {len(students_with_terms)} students with specified completion terms and program levels"
     )
 
+    # Load the semesters of all these programs at once and fold each
+    # program's semester numbers into a bitmask
+    program_ids = list(
+        {
+            student_data.program_id
+            for student_data in students_with_terms
+            if student_data.program_level in program_levels
+        }
+    )
+    semester_masks: Dict[int, int] = defaultdict(int)
+    for start in range(0, len(program_ids), IN_BATCH_SIZE):
+        batch = program_ids[start : start + IN_BATCH_SIZE]
+        semesters = (
+            db.query(
+                StudentSemester.student_program_id, StudentSemester.semester_number
+            )
+            .filter(StudentSemester.student_program_id.in_(batch))
+            .filter(StudentSemester.status.notin_(EXCLUDED_SEMESTER_STATUSES))
+            .yield_per(2000)
+        )
+        for program_id, semester_number in semesters:
+            if semester_number:
+                semester_masks[program_id] |= 1 << semester_number
+
     # Check each student's semester completion
     for student_data in students_with_terms:
         level = student_data.program_level
@@ -198,32 +706,13 @@ def get_students_expected_to_graduate(
         if level not in program_levels:
             continue
 
-        # Get all semesters for this student's program
-        semesters = (
-            db.query(StudentSemester.semester_number)
-            .filter(StudentSemester.student_program_id == student_data.program_id)
-            .filter(
-                StudentSemester.status.notin_(
-                    ["Deleted", "Deferred", "DroppedOut", "Withdrawn"]
-                )
-            )
-            .all()
+        # Check if student meets any of the level's semester requirements
+        semester_mask = semester_masks[student_data.program_id]
+        meets_requirements = any(
+            semester_mask & required == required
+            for required in semester_requirements.get(level, [])
         )
 
-        semester_numbers = {s.semester_number for s in semesters if s.semester_number}
-
-        # Check if student meets semester requirements
-        meets_requirements = False
-        if level in ["certificate", "diploma"]:
-            required_semesters = semester_requirements[level]
-            meets_requirements = required_semesters.issubset(semester_numbers)
-        elif level == "degree":
-            # Check either full 8 semesters or last 3 semesters (6-8)
-            option1, option2 = semester_requirements["degree"]
-            meets_requirements = option1.issubset(semester_numbers) or option2.issubset(
-                semester_numbers
-            )
-
         if meets_requirements:
             expected_students_map[student_data.std_no] = {
                 "std_no": student_data.std_no,
@@ -239,26 +728,32 @@ def get_students_expected_to_graduate(
 
 
 def get_non_graduating_students(
-    db: Session, expected_students: List[Dict]
+    db: Session,
+    expected_students: List[Dict],
+    outstanding_by_std_no: Optional[Dict[int, Dict[str, List[Dict]]]] = None,
 ) -> List[Dict]:
     """
     From the list of expected students, identify those with pending academic issues.
     These are students who should graduate but have:
     - Failed modules that were never repeated
     - Required modules that were never attempted
+
+    outstanding_by_std_no can pass in outstanding modules already loaded with
+    get_outstanding_from_structure_bulk; otherwise they are loaded here.
     """
     non_graduating_students = []
 
     click.echo("Checking expected students for pending academic issues...")
 
-    for index, student in enumerate(expected_students, 1):
-        if index % 50 == 0:
-            click.echo(f"Checked {index}/{len(expected_students)} students...")
+    if outstanding_by_std_no is None:
+        outstanding_by_std_no = get_outstanding_from_structure_bulk(
+            db, (student["std_no"] for student in expected_students)
+        )
 
+    for student in _with_progress(expected_students, "Checked {}/{} students..."):
         std_no = student["std_no"]
 
-        # Get detailed pending issues once to avoid redundant computations
-        pending_issues = get_pending_issues_details(db, std_no)
+        pending_issues = outstanding_by_std_no.get(std_no, {})
 
         # Only include if they actually have pending issues
         failed_never_repeated = pending_issues.get("failedNeverRepeated", [])
@@ -292,81 +787,53 @@ def calculate_graduation_statistics(
     """
     Calculate graduation statistics by school and program, similar to breakdown sheet format.
     """
-    from collections import defaultdict
+    # Count every (school, program, graduating?) group in one pass per list
+    group_counts = Counter()
+    for student in graduating_students:
+        group_counts[(student["school_name"], student["program_name"], True)] += 1
+    for student in non_graduating_students:
+        group_counts[(student["school_name"], student["program_name"], False)] += 1
+
+    # Sorting the (school, program) pairs once here lets every sheet built
+    # from these stats iterate them in order without re-sorting
+    school_program_stats: Dict[str, Dict[str, Dict]] = {}
+    school_counts = Counter()
+    for school, program in sorted({key[:2] for key in group_counts}):
+        graduating = group_counts[(school, program, True)]
+        non_graduating = group_counts[(school, program, False)]
+        school_program_stats.setdefault(school, {})[program] = _graduation_stats(
+            graduating, non_graduating
+        )
+        school_counts[(school, True)] += graduating
+        school_counts[(school, False)] += non_graduating
 
     # Structure: stats[school_name][program_name] = {graduating, non_graduating, expected, percentage}
-    school_program_stats = defaultdict(
-        lambda: defaultdict(
-            lambda: {
-                "graduating": 0,
-                "non_graduating": 0,
-                "expected": 0,
-                "percentage": 0.0,
-            }
-        )
-    )
-    school_totals = defaultdict(
-        lambda: {"graduating": 0, "non_graduating": 0, "expected": 0, "percentage": 0.0}
-    )
-    overall_stats = {
-        "graduating": 0,
-        "non_graduating": 0,
-        "expected": 0,
-        "percentage": 0.0,
+    return {
+        "school_program_stats": school_program_stats,
+        "school_totals": {
+            school: _graduation_stats(
+                school_counts[(school, True)], school_counts[(school, False)]
+            )
+            for school in school_program_stats
+        },
+        "overall_stats": _graduation_stats(
+            len(graduating_students), len(non_graduating_students)
+        ),
     }
 
-    # Count graduating students by school and program
-    for student in graduating_students:
-        school = student["school_name"]
-        program = student["program_name"]
-
-        school_program_stats[school][program]["graduating"] += 1
-        school_totals[school]["graduating"] += 1
-        overall_stats["graduating"] += 1
-
-    # Count non-graduating students by school and program
-    for student in non_graduating_students:
-        school = student["school_name"]
-        program = student["program_name"]
-
-        school_program_stats[school][program]["non_graduating"] += 1
-        school_totals[school]["non_graduating"] += 1
-        overall_stats["non_graduating"] += 1
-
-    # Calculate totals and percentages for each program
-    for school in school_program_stats:
-        for program in school_program_stats[school]:
-            stats = school_program_stats[school][program]
-            stats["expected"] = stats["graduating"] + stats["non_graduating"]
-            if stats["expected"] > 0:
-                stats["percentage"] = (stats["graduating"] / stats["expected"]) * 100
-            else:
-                stats["percentage"] = 0.0
-
-    # Calculate totals and percentages for each school
-    for school in school_totals:
-        stats = school_totals[school]
-        stats["expected"] = stats["graduating"] + stats["non_graduating"]
-        if stats["expected"] > 0:
-            stats["percentage"] = (stats["graduating"] / stats["expected"]) * 100
-        else:
-            stats["percentage"] = 0.0
 
-    # Calculate overall percentage
-    overall_stats["expected"] = (
-        overall_stats["graduating"] + overall_stats["non_graduating"]
-    )
-    if overall_stats["expected"] > 0:
-        overall_stats["percentage"] = (
-            overall_stats["graduating"] / overall_stats["expected"]
-        ) * 100
+def _graduation_stats(graduating: int, non_graduating: int) -> Dict:
+    """Build the statistics entry for a program, a school or overall."""
+    expected = graduating + non_graduating
+    if expected > 0:
+        percentage = (graduating / expected) * 100
     else:
-        overall_stats["percentage"] = 0.0
-
+        percentage = 0.0
     return {
-        "school_program_stats": dict(school_program_stats),
-        "school_totals": dict(school_totals),
-        "overall_stats": overall_stats,
+        "graduating": graduating,
+        "non_graduating": non_graduating,
+        "expected": expected,
+        "percentage": percentage,
     }
 
 
@@ -385,185 +852,219 @@ def calculate_cgpa_and_classification_for_program(
             return None, "No Program Provided"
 
         # Get all semesters for the specified program (excluding deleted/deferred/etc)
-        semesters = (
-            db.query(StudentSemester)
-            .filter(StudentSemester.student_program_id == program.id)
-            .filter(
-                StudentSemester.status.notin_(
-                    ["Deleted", "Deferred", "DroppedOut", "Withdrawn"]
-                )
+        # together with their student modules (excluding Delete/Drop status) in
+        # one query. Modules are outer joined so semesters without any are kept;
+        # a module without a semester module comes back with no credits.
+        rows = (
+            db.query(
+                StudentSemester.id,
+                StudentModule.id,
+                StudentModule.grade,
+                StudentModule.status,
+                SemesterModule.credits,
             )
-            .order_by(StudentSemester.id)
+            .select_from(StudentSemester)
+            .outerjoin(
+                StudentModule,
+                and_(
+                    StudentModule.student_semester_id == StudentSemester.id,
+                    StudentModule.status.notin_(EXCLUDED_MODULE_STATUSES),
+                ),
+            )
+            .outerjoin(
+                SemesterModule, StudentModule.semester_module_id == SemesterModule.id
+            )
+            .filter(StudentSemester.student_program_id == program.id)
+            .filter(StudentSemester.status.notin_(EXCLUDED_SEMESTER_STATUSES))
+            .order_by(StudentSemester.id, StudentModule.id)
             .all()
         )
 
-        if not semesters:
+        if not rows:
             return None, "No Semesters Found"
 
         # Prepare semester data for CGPA calculation
-        semesters_data = []
-        for semester in semesters:
-            # Get all student modules for this semester (excluding Delete/Drop status)
-            modules = (
-                db.query(StudentModule, SemesterModule.credits)
-                .join(
-                    SemesterModule,
-                    StudentModule.semester_module_id == SemesterModule.id,
-                )
-                .filter(StudentModule.student_semester_id == semester.id)
-                .filter(StudentModule.status.notin_(["Delete", "Drop"]))
-                .all()
-            )
-
-            modules_data = []
-            for student_module, credits in modules:
-                grade = student_module.grade or ""
-
-                modules_data.append(
+        semesters_data = [
+            {
+                "id": semester_id,
+                "modules": [
                     {
-                        "grade": grade,
-                        "status": student_module.status,
+                        "grade": grade or "",
+                        "status": status,
                         "credits": float(credits),
                     }
-                )
+                    for _, module_id, grade, status, credits in semester_rows
+                    # Skips the empty row of a semester without modules and
+                    # modules without a semester module, as the bulk
+                    # calculation's inner join does
+                    if credits is not None
+                ],
+            }
+            for semester_id, semester_rows in groupby(rows, key=itemgetter(0))
+        ]
 
-            semesters_data.append({"id": semester.id, "modules": modules_data})
+        return _classify_semesters(semesters_data)
 
-        # Calculate CGPA using the comprehensive calculation
-        grade_points, final_cgpa = calculate_cgpa_from_semesters(semesters_data)
+    except Exception as e:
+        click.echo(f"Error calculating CGPA for student {std_no}: {str(e)}")
+        return None, "Calculation Error"
 
-        if final_cgpa == 0:
-            return None, "No Valid Grades"
 
-        # Round CGPA first to avoid floating-point precision issues
-        # Classification should be based on the rounded value that students see
-        rounded_cgpa = round(final_cgpa, 2)
+def _classify_semesters(semesters_data: List[Dict]) -> Tuple[Optional[float], str]:
+    """
+    Calculate CGPA from prepared semester data and classify it.
+    """
+    # Calculate CGPA using the comprehensive calculation
+    grade_points, final_cgpa = calculate_cgpa_from_semesters(semesters_data)
 
-        # Determine classification based on CGPA using grade descriptions
-        if rounded_cgpa >= 3.5:  # A+, A, A- range (Pass with Distinction)
-            classification = "Distinction"
-        elif rounded_cgpa >= 3.0:  # B+, B, B- range (Pass with Merit)
-            classification = "Merit"
-        elif rounded_cgpa >= 1.7:  # C+, C, C- range (Pass)
-            classification = "Pass"
-        else:
-            classification = "Failed"
+    if final_cgpa == 0:
+        return None, "No Valid Grades"
 
-        return rounded_cgpa, classification
+    # Round CGPA first to avoid floating-point precision issues
+    # Classification should be based on the rounded value that students see
+    rounded_cgpa = round(final_cgpa, 2)
 
-    except Exception as e:
-        click.echo(f"Error calculating CGPA for student {std_no}: {str(e)}")
-        return None, "Calculation Error"
+    # Determine classification based on CGPA using grade descriptions
+    classification = CLASSIFICATIONS[
+        bisect_right(CLASSIFICATION_THRESHOLDS, rounded_cgpa)
+    ]
 
+    return rounded_cgpa, classification
 
-def calculate_cgpa_and_classification(
-    db: Session, std_no: int
-) -> Tuple[Optional[float], str]:
-    """
-    Calculate CGPA and determine classification for a student based on their active or latest completed program.
-    Uses the same logic as the JavaScript implementation.
 
-    Returns:
-        Tuple of (CGPA, Classification)
+def calculate_cgpa_and_classification_bulk(
+    db: Session, programs: Iterable[StudentProgram]
+) -> Dict[int, Tuple[Optional[float], str]]:
     """
-    try:
-        # Get active program first, if not found get latest completed program
-        active_program = (
-            db.query(StudentProgram)
-            .filter(
-                and_(StudentProgram.std_no == std_no, StudentProgram.status == "Active")
-            )
-            .first()
-        )
+    Calculate CGPA and classification for many student programs at once.
 
-        if not active_program:
-            # Try to get the latest completed program
-            active_program = (
-                db.query(StudentProgram)
-                .filter(
-                    and_(
-                        StudentProgram.std_no == std_no,
-                        StudentProgram.status == "Completed",
-                    )
-                )
-                .order_by(StudentProgram.created_at.desc())
-                .first()
-            )
+    Same rules as calculate_cgpa_and_classification_for_program, but the
+    semesters and modules of all programs are loaded with one query each per
+    batch of programs. Results are keyed by student program id.
+    """
+    std_no_by_program = {program.id: program.std_no for program in programs}
+    program_ids = list(std_no_by_program)
 
-        if not active_program:
-            return None, "No Active or Completed Program"
+    semester_ids_by_program: Dict[int, List[int]] = {
+        program_id: [] for program_id in program_ids
+    }
+    modules_by_semester: Dict[int, List[Tuple]] = {}
+    for start in range(0, len(program_ids), IN_BATCH_SIZE):
+        batch = program_ids[start : start + IN_BATCH_SIZE]
 
-        # Get all semesters for the active program (excluding deleted/deferred/etc)
+        # Semesters for these programs (excluding deleted/deferred/etc)
         semesters = (
-            db.query(StudentSemester)
-            .filter(StudentSemester.student_program_id == active_program.id)
-            .filter(
-                StudentSemester.status.notin_(
-                    ["Deleted", "Deferred", "DroppedOut", "Withdrawn"]
-                )
-            )
+            db.query(StudentSemester.id, StudentSemester.student_program_id)
+            .filter(StudentSemester.student_program_id.in_(batch))
+            .filter(StudentSemester.status.notin_(EXCLUDED_SEMESTER_STATUSES))
             .order_by(StudentSemester.id)
             .all()
         )
+        for semester_id, program_id in semesters:
+            semester_ids_by_program[program_id].append(semester_id)
+            modules_by_semester[semester_id] = []
 
-        if not semesters:
-            return None, "No Semesters Found"
-
-        # Prepare semester data for CGPA calculation
-        semesters_data = []
-        for semester in semesters:
-            # Get all student modules for this semester (excluding Delete/Drop status)
-            modules = (
-                db.query(StudentModule, SemesterModule.credits)
-                .join(
-                    SemesterModule,
-                    StudentModule.semester_module_id == SemesterModule.id,
-                )
-                .filter(StudentModule.student_semester_id == semester.id)
-                .filter(StudentModule.status.notin_(["Delete", "Drop"]))
-                .all()
+        # Their student modules (excluding Delete/Drop status)
+        modules = (
+            db.query(
+                StudentModule.student_semester_id,
+                StudentModule.grade,
+                StudentModule.status,
+                SemesterModule.credits,
+            )
+            .join(SemesterModule, StudentModule.semester_module_id == SemesterModule.id)
+            .join(
+                StudentSemester, StudentModule.student_semester_id == StudentSemester.id
             )
+            .filter(StudentSemester.student_program_id.in_(batch))
+            .filter(StudentSemester.status.notin_(EXCLUDED_SEMESTER_STATUSES))
+            .filter(StudentModule.status.notin_(EXCLUDED_MODULE_STATUSES))
+            .order_by(StudentModule.id)
+            .all()
+        )
+        for semester_id, grade, status, credits in modules:
+            modules_by_semester[semester_id].append((grade, status, credits))
 
-            modules_data = []
-            for student_module, credits in modules:
-                grade = student_module.grade or ""
+    results: Dict[int, Tuple[Optional[float], str]] = {}
+    for program_id, semester_ids in semester_ids_by_program.items():
+        if not semester_ids:
+            results[program_id] = (None, "No Semesters Found")
+            continue
 
-                modules_data.append(
-                    {
-                        "grade": grade,
-                        "status": student_module.status,
-                        "credits": float(credits),
-                    }
-                )
+        try:
+            semesters_data = [
+                {
+                    "id": semester_id,
+                    "modules": [
+                        {
+                            "grade": grade or "",
+                            "status": status,
+                            "credits": float(credits),
+                        }
+                        for grade, status, credits in modules_by_semester[semester_id]
+                    ],
+                }
+                for semester_id in semester_ids
+            ]
+            results[program_id] = _classify_semesters(semesters_data)
+        except Exception as e:
+            std_no = std_no_by_program[program_id]
+            click.echo(f"Error calculating CGPA for student {std_no}: {str(e)}")
+            results[program_id] = (None, "Calculation Error")
 
-            semesters_data.append({"id": semester.id, "modules": modules_data})
+    return results
 
-        # Calculate CGPA using the comprehensive calculation
-        grade_points, final_cgpa = calculate_cgpa_from_semesters(semesters_data)
 
-        if final_cgpa == 0:
-            return None, "No Valid Grades"
+def _find_target_program(db: Session, std_no: int) -> Optional[StudentProgram]:
+    """
+    Get the student's active program, or their latest completed program.
+    """
+    active_program = (
+        db.query(StudentProgram)
+        .filter(
+            and_(StudentProgram.std_no == std_no, StudentProgram.status == "Active")
+        )
+        .first()
+    )
 
-        # Round CGPA first to avoid floating-point precision issues
-        # Classification should be based on the rounded value that students see
-        rounded_cgpa = round(final_cgpa, 2)
+    if not active_program:
+        # Try to get the latest completed program
+        active_program = (
+            db.query(StudentProgram)
+            .filter(
+                and_(
+                    StudentProgram.std_no == std_no,
+                    StudentProgram.status == "Completed",
+                )
+            )
+            .order_by(StudentProgram.created_at.desc())
+            .first()
+        )
+
+    return active_program
 
-        # Determine classification based on CGPA using grade descriptions
-        if rounded_cgpa >= 3.5:  # A+, A, A- range (Pass with Distinction)
-            classification = "Distinction"
-        elif rounded_cgpa >= 3.0:  # B+, B, B- range (Pass with Merit)
-            classification = "Merit"
-        elif rounded_cgpa >= 1.7:  # C+, C, C- range (Pass)
-            classification = "Pass"
-        else:
-            classification = "Failed"
 
-        return rounded_cgpa, classification
+def calculate_cgpa_and_classification(
+    db: Session, std_no: int
+) -> Tuple[Optional[float], str]:
+    """
+    Calculate CGPA and determine classification for a student based on their active or latest completed program.
+    Uses the same logic as the JavaScript implementation.
 
+    Returns:
+        Tuple of (CGPA, Classification)
+    """
+    try:
+        program = _find_target_program(db, std_no)
     except Exception as e:
         click.echo(f"Error calculating CGPA for student {std_no}: {str(e)}")
         return None, "Calculation Error"
 
+    if not program:
+        return None, "No Active or Completed Program"
+
+    return calculate_cgpa_and_classification_for_program(db, std_no, program)
+
 
 def get_student_classification(db: Session, std_no: int) -> Optional[str]:
     """
@@ -581,6 +1082,9 @@ def export_graduating_students(
     completion_terms: List[str],
     program_levels: List[str],
     exclude_cleared: bool = False,
+    quiet: bool = False,
+    segment_by_school: Optional[bool] = None,
+    export_format: Optional[str] = None,
 ) -> None:
     """
     Export graduating students to Excel file.
@@ -601,6 +1105,14 @@ def export_graduating_students(
         completion_terms: List of completion terms to check (e.g., ["2025-02", "2024-07"])
         program_levels: List of program levels to include (e.g., ["diploma", "degree"])
         exclude_cleared: If True, exclude students with approved academic graduation clearances
+        quiet: If True, skip the per-school and per-program breakdown in the summary
+        segment_by_school: If True, write each school's graduating students to a
+            workbook of its own and list them on an "Index" sheet of the main
+            workbook. Defaults to segmenting only when there are more than
+            SEGMENT_BY_SCHOOL_THRESHOLD graduating students.
+        export_format: "xlsx" for the workbook, "csv" for a plain CSV of the
+            graduating students, or "both". Defaults to "both" when there are
+            more than CSV_EXPORT_THRESHOLD graduating students, else "xlsx".
     """
     graduating_students = []
 
@@ -610,12 +1122,13 @@ def export_graduating_students(
         click.echo(
             "Skipping students with approved academic graduation clearances (--exclude-cleared flag set)..."
         )
+        approved_student_names: Dict[int, str] = {}
         approved_std_nos = set()
     else:
         click.echo("Finding students with approved academic graduation clearances...")
 
-        approved_graduation_students = (
-            db.query(StudentProgram.std_no)
+        approved_programs = (
+            select(StudentProgram.std_no)
             .join(
                 GraduationRequest,
                 StudentProgram.id == GraduationRequest.student_program_id,
@@ -627,7 +1140,7 @@ def export_graduating_students(
             .join(Clearance, GraduationClearance.clearance_id == Clearance.id)
             .join(Structure, StudentProgram.structure_id == Structure.id)
             .join(Program, Structure.program_id == Program.id)
-            .filter(
+            .where(
                 and_(
                     Clearance.department == "academic",
                     Clearance.status == "approved",
@@ -636,10 +1149,20 @@ def export_graduating_students(
                     ),  # Filter by specified program levels
                 )
             )
-            .all()
         )
 
-        approved_std_nos = {row.std_no for row in approved_graduation_students}
+        # Student names come along so they need not be looked up again later
+        approved_std_nos_stmt = (
+            approved_programs.add_columns(Student.name)
+            .join(Student, StudentProgram.std_no == Student.std_no)
+            .distinct()
+            .execution_options(yield_per=1000)
+        )
+
+        approved_student_names = {
+            std_no: name for std_no, name in db.execute(approved_std_nos_stmt)
+        }
+        approved_std_nos = set(approved_student_names)
         click.echo(
             f"Found {len(approved_std_nos)} students with approved academic clearances (100% graduating)"
         )
@@ -655,18 +1178,32 @@ def export_graduating_students(
     expected_graduating = []
     expected_with_issues = []
 
-    for index, student in enumerate(expected_students, 1):
-        if index % 50 == 0:
-            click.echo(f"Checked {index}/{len(expected_students)} expected students...")
+    # Skip students who are already approved (they're 100% graduating)
+    remaining_students = [
+        student
+        for student in expected_students
+        if student["std_no"] not in approved_std_nos
+    ]
 
-        std_no = student["std_no"]
+    # Load outstanding modules for every candidate up front instead of
+    # querying programs and structures one student at a time
+    outstanding_by_std_no = get_outstanding_from_structure_bulk(
+        db, (student["std_no"] for student in remaining_students)
+    )
 
-        # Skip if already approved (they're 100% graduating)
-        if std_no in approved_std_nos:
-            continue
+    for student in _with_progress(
+        remaining_students, "Checked {}/{} expected students..."
+    ):
+        std_no = student["std_no"]
 
-        # Check for pending issues
-        if has_no_pending_issues(db, std_no):
+        # Check for pending issues; students without a usable program or
+        # whose check failed are treated as having issues
+        outstanding = outstanding_by_std_no.get(std_no)
+        if outstanding is None:
+            expected_with_issues.append(student)
+        elif (
+            not outstanding["failedNeverRepeated"] and not outstanding["neverAttempted"]
+        ):
             expected_graduating.append(student)
         else:
             expected_with_issues.append(student)
@@ -675,7 +1212,9 @@ def export_graduating_students(
     click.echo(f"Expected students with pending issues: {len(expected_with_issues)}")
 
     # Get non-graduating students (those with pending issues)
-    non_graduating_students = get_non_graduating_students(db, expected_with_issues)
+    non_graduating_students = get_non_graduating_students(
+        db, expected_with_issues, outstanding_by_std_no
+    )
 
     # Step 4: Combine all graduating students
     all_graduating_std_nos = approved_std_nos | {
@@ -693,33 +1232,46 @@ def export_graduating_students(
     # Get detailed information for all graduating students
     click.echo("Collecting student details...")
 
-    # Preload student names for faster lookups
-    student_names = (
-        db.query(Student.std_no, Student.name)
-        .filter(Student.std_no.in_(graduating_std_list))
-        .all()
-    )
-    student_name_map = {row.std_no: row.name for row in student_names}
+    # Every graduating student is either approved or expected, and both
+    # queries already returned their names
+    student_name_map = {
+        student["std_no"]: student["student_name"] for student in expected_graduating
+    }
+    student_name_map.update(approved_student_names)
 
     # Prepare eager loading of related program data
     program_loader = (
-        joinedload(StudentProgram.structure)
-        .joinedload(Structure.program)
-        .joinedload(Program.school)
+        selectinload(StudentProgram.structure)
+        .selectinload(Structure.program)
+        .selectinload(Program.school)
     )
 
     # Preload active and completed programs for all candidates
-    # For students with multiple completed programs, we'll select the latest one
-    program_rows = (
-        db.query(StudentProgram)
-        .options(program_loader)
+    # For students with multiple programs of a status, the database ranks them
+    # by created_at and only the latest one per (student, status) is fetched
+    program_rank = (
+        func.row_number()
+        .over(
+            partition_by=(StudentProgram.std_no, StudentProgram.status),
+            order_by=(StudentProgram.created_at.desc(), StudentProgram.id),
+        )
+        .label("program_rank")
+    )
+    ranked_programs = (
+        db.query(StudentProgram.id, program_rank)
         .filter(
             and_(
                 StudentProgram.std_no.in_(graduating_std_list),
                 StudentProgram.status.in_(["Active", "Completed"]),
             )
         )
-        .order_by(StudentProgram.std_no, StudentProgram.created_at.desc())
+        .subquery()
+    )
+    program_rows = (
+        db.query(StudentProgram)
+        .options(program_loader)
+        .join(ranked_programs, ranked_programs.c.id == StudentProgram.id)
+        .filter(ranked_programs.c.program_rank == 1)
         .all()
     )
 
@@ -729,17 +1281,31 @@ def export_graduating_students(
 
     for program in program_rows:
         if program.status == "Active":
-            active_program_map.setdefault(program.std_no, program)
+            active_program_map[program.std_no] = program
         elif program.status == "Completed":
-            # Only store the latest completed program (already sorted by created_at desc)
-            completed_program_map.setdefault(program.std_no, program)
+            completed_program_map[program.std_no] = program
 
     # Preload approved programs using graduation requests
     approved_program_map: Dict[int, StudentProgram] = {}
     if approved_std_nos and not exclude_cleared:
-        approved_program_rows = (
-            db.query(StudentProgram, GraduationRequest.created_at)
-            .options(program_loader)
+        # Rank each student's approved graduation requests by recency in the
+        # database and load only the program of the latest one. Approved
+        # students are matched with the approval query itself rather than
+        # sending their student numbers back as parameters
+        approved_subquery = approved_programs.subquery()
+        expected_graduating_std_nos = [
+            student["std_no"] for student in expected_graduating
+        ]
+        request_rank = (
+            func.row_number()
+            .over(
+                partition_by=StudentProgram.std_no,
+                order_by=(GraduationRequest.created_at.desc(), GraduationRequest.id),
+            )
+            .label("request_rank")
+        )
+        ranked_requests = (
+            db.query(StudentProgram.id, request_rank)
             .join(
                 GraduationRequest,
                 StudentProgram.id == GraduationRequest.student_program_id,
@@ -751,51 +1317,72 @@ def export_graduating_students(
             .join(Clearance, GraduationClearance.clearance_id == Clearance.id)
             .filter(
                 and_(
-                    StudentProgram.std_no.in_(graduating_std_list),
+                    or_(
+                        StudentProgram.std_no.in_(select(approved_subquery.c.std_no)),
+                        StudentProgram.std_no.in_(expected_graduating_std_nos),
+                    ),
                     Clearance.department == "academic",
                     Clearance.status == "approved",
                 )
             )
-            .order_by(StudentProgram.std_no, GraduationRequest.created_at.desc())
+            .subquery()
+        )
+        approved_program_rows = (
+            db.query(StudentProgram)
+            .options(program_loader)
+            .join(ranked_requests, ranked_requests.c.id == StudentProgram.id)
+            .filter(ranked_requests.c.request_rank == 1)
             .all()
         )
+        approved_program_map = {
+            program.std_no: program for program in approved_program_rows
+        }
+
+    # Resolve every student's target program first so CGPAs can be
+    # calculated for all of them in one batch
+    target_programs: Dict[int, StudentProgram] = {}
+    for std_no in graduating_std_list:
+        # Prefer approved program if available (unless exclude_cleared is True)
+        # Otherwise prefer active over completed
+        # For completed programs, use the latest one
+        if exclude_cleared:
+            # When excluding cleared students, ignore approved programs
+            target_program = active_program_map.get(std_no)
+            if not target_program:
+                target_program = completed_program_map.get(std_no)
+        else:
+            # Normal logic: prefer approved program
+            target_program = approved_program_map.get(std_no)
+            if not target_program:
+                target_program = active_program_map.get(std_no)
+            if not target_program:
+                target_program = completed_program_map.get(std_no)
+
+        if target_program:
+            target_programs[std_no] = target_program
+
+    # Calculate CGPA using the target program (graduation request program or active program)
+    cgpa_by_program = calculate_cgpa_and_classification_bulk(
+        db, target_programs.values()
+    )
 
-        latest_request_per_student: Dict[int, int] = {}
-        for program, created_at in approved_program_rows:
-            created_at_value = created_at or 0
-            std_no = program.std_no
-            if (
-                std_no not in latest_request_per_student
-                or created_at_value > latest_request_per_student[std_no]
-            ):
-                approved_program_map[std_no] = program
-                latest_request_per_student[std_no] = created_at_value
-
-    for i, std_no in enumerate(graduating_std_list, 1):
-        if i % 50 == 0:
-            click.echo(f"Processed {i}/{len(all_graduating_std_nos)} students...")
+    # First match wins, as with the original list scan
+    expected_criteria_map: Dict[int, str] = {}
+    for expected_student in expected_graduating:
+        expected_criteria_map.setdefault(
+            expected_student["std_no"], expected_student["criteria"]
+        )
 
+    # Students with a "Failed" classification are counted and left out as
+    # they are processed
+    failed_count = 0
+    for std_no in _with_progress(graduating_std_list, "Processed {}/{} students..."):
         try:
             student_name = student_name_map.get(std_no)
             if not student_name:
                 continue
 
-            # Prefer approved program if available (unless exclude_cleared is True)
-            # Otherwise prefer active over completed
-            # For completed programs, use the latest one
-            if exclude_cleared:
-                # When excluding cleared students, ignore approved programs
-                target_program = active_program_map.get(std_no)
-                if not target_program:
-                    target_program = completed_program_map.get(std_no)
-            else:
-                # Normal logic: prefer approved program
-                target_program = approved_program_map.get(std_no)
-                if not target_program:
-                    target_program = active_program_map.get(std_no)
-                if not target_program:
-                    target_program = completed_program_map.get(std_no)
-
+            target_program = target_programs.get(std_no)
             if not target_program:
                 continue
 
@@ -806,20 +1393,19 @@ def export_graduating_students(
             program_name = program.name if program else "Unknown Program"
             school_name = school.name if school else "Unknown School"
 
-            # Calculate CGPA using the target program (graduation request program or active program)
-            cgpa, classification = calculate_cgpa_and_classification_for_program(
-                db, std_no, target_program
-            )
+            cgpa, classification = cgpa_by_program[target_program.id]
+            if classification == "Failed":
+                failed_count += 1
+                continue
 
             # Determine graduation criteria met
             criteria_met = []
             if std_no in approved_std_nos:
                 criteria_met.append("Approved Clearance")
             # Check if student is in expected graduating list
-            for expected_student in expected_graduating:
-                if expected_student["std_no"] == std_no:
-                    criteria_met.append(expected_student["criteria"])
-                    break
+            expected_criteria = expected_criteria_map.get(std_no)
+            if expected_criteria is not None:
+                criteria_met.append(expected_criteria)
 
             graduating_students.append(
                 {
@@ -830,6 +1416,12 @@ def export_graduating_students(
                     "cgpa": cgpa if cgpa is not None else "N/A",
                     "classification": classification,
                     "criteria_met": " & ".join(criteria_met),
+                    # Negative CGPA so higher CGPAs sort first
+                    "_sort_key": (
+                        school_name,
+                        program_name,
+                        -cgpa if cgpa is not None else 0.0,
+                    ),
                 }
             )
 
@@ -837,17 +1429,10 @@ def export_graduating_students(
             click.echo(f"Error processing student {std_no}: {str(e)}")
             continue
 
-    if not graduating_students:
+    if not graduating_students and not failed_count:
         click.secho("No valid graduating students found after processing.", fg="yellow")
         return
 
-    # Filter out students with "Failed" classification
-    initial_count = len(graduating_students)
-    graduating_students = [
-        s for s in graduating_students if s["classification"] != "Failed"
-    ]
-    failed_count = initial_count - len(graduating_students)
-
     if failed_count > 0:
         click.echo(f"Excluded {failed_count} students with 'Failed' classification")
 
@@ -864,331 +1449,46 @@ def export_graduating_students(
     )
 
     # Sort students by school name, program name, then CGPA (descending)
-    graduating_students.sort(
-        key=lambda x: (
-            x["school_name"],
-            x["program_name"],
-            -(
-                x["cgpa"] if isinstance(x["cgpa"], (int, float)) else 0
-            ),  # Negative for descending CGPA
-        )
-    )
+    graduating_students.sort(key=itemgetter("_sort_key"))
 
     # Export to Excel
     output_dir = "exports"
     os.makedirs(output_dir, exist_ok=True)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    excel_filename = f"graduating_students_{timestamp}.xlsx"
-    excel_path = os.path.join(output_dir, excel_filename)
-
-    wb = Workbook()
-    ws = wb.active
-    if ws is None:
-        # This should never happen with a new workbook, but let's handle it
-        ws = wb.create_sheet("Graduating Students")
-    else:
-        ws.title = "Graduating Students"
-
-    # Set up headers
-    headers = [
-        "Student Number",
-        "Student Name",
-        "School Name",
-        "Program Name",
-        "CGPA",
-        "Classification",
-        "Criteria Met",
-    ]
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(
-        start_color="000000", end_color="000000", fill_type="solid"
-    )
-
-    header_widths = [len(header) for header in headers]
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-
-    # Add data rows
-    for row, student in enumerate(graduating_students, 2):
-        row_values = [
-            student["student_number"],
-            student["student_name"],
-            student["school_name"],
-            student["program_name"],
-            student["cgpa"],
-            student["classification"],
-            student["criteria_met"],
-        ]
-        for col_index, value in enumerate(row_values, 1):
-            ws.cell(row=row, column=col_index, value=value)
-            if value is not None:
-                header_widths[col_index - 1] = max(
-                    header_widths[col_index - 1], len(str(value))
-                )
-
-    for idx, width in enumerate(header_widths, 1):
-        adjusted_width = min(width + 2, 50)
-        ws.column_dimensions[get_column_letter(idx)].width = adjusted_width
 
-    # Create breakdown sheet
-    breakdown_ws = wb.create_sheet("School & Program Breakdown")
-
-    # Prepare breakdown data
-    from collections import defaultdict
-
-    school_program_stats = defaultdict(lambda: defaultdict(int))
-    school_totals = defaultdict(int)
-
-    # Calculate statistics
-    for student in graduating_students:
-        school = student["school_name"]
-        program = student["program_name"]
-        school_program_stats[school][program] += 1
-        school_totals[school] += 1
-
-    # Set up breakdown sheet headers (use the same black header_fill)
-    breakdown_headers = ["School/Faculty", "Program", "Student Count"]
-    breakdown_widths = [len(header) for header in breakdown_headers]
-    for col, header in enumerate(breakdown_headers, 1):
-        cell = breakdown_ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-
-    # Add breakdown data
-    row = 2
-    for school in sorted(school_program_stats.keys()):
-        # Add school header row spanning three columns
-        for col in range(1, 4):  # Columns 1, 2, 3
-            if col == 1:
-                cell = breakdown_ws.cell(row=row, column=col, value=school)
-                breakdown_widths[0] = max(breakdown_widths[0], len(str(school)))
-            else:
-                cell = breakdown_ws.cell(row=row, column=col)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(
-                start_color="444444", end_color="444444", fill_type="solid"
-            )
-        row += 1
-
-        # Add programs for this school
-        programs = sorted(school_program_stats[school].keys())
-        for program in programs:
-            count = school_program_stats[school][program]
-            breakdown_ws.cell(row=row, column=1, value="")  # Indent for program
-            breakdown_ws.cell(row=row, column=2, value=program)
-            breakdown_ws.cell(row=row, column=3, value=count)
-            breakdown_widths[1] = max(breakdown_widths[1], len(str(program)))
-            breakdown_widths[2] = max(breakdown_widths[2], len(str(count)))
-            row += 1
-
-        # Add school total
-        total_cell = breakdown_ws.cell(row=row, column=2, value="Total")
-        total_cell.font = Font(bold=True, color="444444")
-        breakdown_widths[1] = max(breakdown_widths[1], len("Total"))
-
-        total_count_cell = breakdown_ws.cell(
-            row=row, column=3, value=school_totals[school]
+    if export_format is None:
+        export_format = (
+            "both" if len(graduating_students) > CSV_EXPORT_THRESHOLD else "xlsx"
         )
-        total_count_cell.font = Font(bold=True, color="444444")
-        breakdown_widths[2] = max(breakdown_widths[2], len(str(school_totals[school])))
-
-        row += 2  # Add space between schools
-
-    # Add grand total
-    grand_total_row = row
-    breakdown_ws.cell(row=grand_total_row, column=2, value="GRAND TOTAL")
-    breakdown_ws.cell(row=grand_total_row, column=3, value=len(graduating_students))
-    breakdown_widths[1] = max(breakdown_widths[1], len("GRAND TOTAL"))
-    breakdown_widths[2] = max(breakdown_widths[2], len(str(len(graduating_students))))
 
-    for col in [2, 3]:
-        cell = breakdown_ws.cell(row=grand_total_row, column=col)
-        cell.font = Font(bold=True, color="FFFFFF")
-        cell.fill = header_fill
+    if export_format in ("csv", "both"):
+        csv_path = os.path.join(output_dir, f"graduating_students_{timestamp}.csv")
+        with open(csv_path, "w", newline="", encoding="utf-8") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(GRADUATING_HEADERS)
+            writer.writerows(map(GRADUATING_ROW, graduating_students))
 
-    for idx, width in enumerate(breakdown_widths, 1):
-        adjusted_width = min(width + 2, 60)
-        breakdown_ws.column_dimensions[get_column_letter(idx)].width = adjusted_width
-
-    # Create non-graduating students sheet
-    if non_graduating_students:
-        non_grad_ws = wb.create_sheet("Non-Graduating Students")
-
-        # Set up headers for non-graduating students
-        non_grad_headers = [
-            "Student Number",
-            "Student Name",
-            "School Name",
-            "Program Name",
-            "Program Level",
-            "Criteria",
-            "Failed Never Repeated",
-            "Never Attempted",
-        ]
-
-        non_grad_widths = [len(header) for header in non_grad_headers]
-        for col, header in enumerate(non_grad_headers, 1):
-            cell = non_grad_ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-
-        # Add non-graduating student data
-        for row, student in enumerate(non_graduating_students, 2):
-            failed_modules = [
-                f"{module['code']} - {module['name']}"
-                for module in student["failed_never_repeated"]
-            ]
-            never_attempted_modules = [
-                f"{module['code']} - {module['name']}"
-                for module in student["never_attempted"]
-            ]
-
-            row_values = [
-                student["student_number"],
-                student["student_name"],
-                student["school_name"],
-                student["program_name"],
-                student["program_level"].title(),
-                student.get("criteria", ""),
-                "; ".join(failed_modules) if failed_modules else "None",
-                (
-                    "; ".join(never_attempted_modules)
-                    if never_attempted_modules
-                    else "None"
-                ),
-            ]
-
-            for col_index, value in enumerate(row_values, 1):
-                non_grad_ws.cell(row=row, column=col_index, value=value)
-                if value is not None:
-                    non_grad_widths[col_index - 1] = max(
-                        non_grad_widths[col_index - 1], len(str(value))
-                    )
-
-        for idx, width in enumerate(non_grad_widths, 1):
-            adjusted_width = min(width + 2, 80)
-            non_grad_ws.column_dimensions[get_column_letter(idx)].width = adjusted_width
-
-    # Create graduation statistics sheet
-    stats_ws = wb.create_sheet("Graduation Statistics")
-
-    # Set up headers for statistics breakdown (use black header_fill)
-    stats_headers = [
-        "School/Faculty",
-        "Program",
-        "Expected",
-        "Graduating",
-        "Non-Graduating",
-        "Graduation Rate (%)",
-    ]
-
-    for col, header in enumerate(stats_headers, 1):
-        cell = stats_ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-
-    # Add statistics breakdown data
-    row = 2
-    school_program_stats = graduation_stats["school_program_stats"]
-    school_totals = graduation_stats["school_totals"]
-    overall_stats = graduation_stats["overall_stats"]
-
-    stats_widths = [len(header) for header in stats_headers]
-
-    for school in sorted(school_program_stats.keys()):
-        # Add school header row spanning all columns
-        for col in range(1, 7):  # Columns 1-6
-            if col == 1:
-                cell = stats_ws.cell(row=row, column=col, value=school)
-                stats_widths[0] = max(stats_widths[0], len(str(school)))
-            else:
-                cell = stats_ws.cell(row=row, column=col)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(
-                start_color="444444", end_color="444444", fill_type="solid"
-            )
-        row += 1
-
-        # Add programs for this school
-        programs = sorted(school_program_stats[school].keys())
-        for program in programs:
-            stats = school_program_stats[school][program]
-            stats_ws.cell(row=row, column=1, value="")  # Indent for program
-            stats_ws.cell(row=row, column=2, value=program)
-            stats_ws.cell(row=row, column=3, value=stats["expected"])
-            stats_ws.cell(row=row, column=4, value=stats["graduating"])
-            stats_ws.cell(row=row, column=5, value=stats["non_graduating"])
-            stats_ws.cell(row=row, column=6, value=f"{stats['percentage']:.1f}%")
-            stats_widths[1] = max(stats_widths[1], len(str(program)))
-            stats_widths[2] = max(stats_widths[2], len(str(stats["expected"])))
-            stats_widths[3] = max(stats_widths[3], len(str(stats["graduating"])))
-            stats_widths[4] = max(stats_widths[4], len(str(stats["non_graduating"])))
-            stats_widths[5] = max(stats_widths[5], len(f"{stats['percentage']:.1f}%"))
-            row += 1
-
-        # Add school total
-        school_stats = school_totals[school]
-        total_cell = stats_ws.cell(row=row, column=2, value="Total")
-        total_cell.font = Font(bold=True, color="444444")
-
-        stats_ws.cell(row=row, column=3, value=school_stats["expected"])
-        stats_ws.cell(row=row, column=4, value=school_stats["graduating"])
-        stats_ws.cell(row=row, column=5, value=school_stats["non_graduating"])
-
-        rate_cell = stats_ws.cell(
-            row=row, column=6, value=f"{school_stats['percentage']:.1f}%"
-        )
-        rate_cell.font = Font(bold=True, color="444444")
-
-        for col in [3, 4, 5]:
-            cell = stats_ws.cell(row=row, column=col)
-            cell.font = Font(bold=True, color="444444")
-
-        stats_widths[1] = max(stats_widths[1], len("Total"))
-        stats_widths[2] = max(stats_widths[2], len(str(school_stats["expected"])))
-        stats_widths[3] = max(stats_widths[3], len(str(school_stats["graduating"])))
-        stats_widths[4] = max(stats_widths[4], len(str(school_stats["non_graduating"])))
-        stats_widths[5] = max(
-            stats_widths[5], len(f"{school_stats['percentage']:.1f}%")
+        click.secho(
+            f"Successfully exported graduating students to: {csv_path}", fg="green"
         )
 
-        row += 2  # Add space between schools
-
-    # Add grand total
-    grand_total_row = row
-    stats_ws.cell(row=grand_total_row, column=2, value="GRAND TOTAL")
-    stats_ws.cell(row=grand_total_row, column=3, value=overall_stats["expected"])
-    stats_ws.cell(row=grand_total_row, column=4, value=overall_stats["graduating"])
-    stats_ws.cell(row=grand_total_row, column=5, value=overall_stats["non_graduating"])
-    stats_ws.cell(
-        row=grand_total_row, column=6, value=f"{overall_stats['percentage']:.1f}%"
-    )
-
-    stats_widths[1] = max(stats_widths[1], len("GRAND TOTAL"))
-    stats_widths[2] = max(stats_widths[2], len(str(overall_stats["expected"])))
-    stats_widths[3] = max(stats_widths[3], len(str(overall_stats["graduating"])))
-    stats_widths[4] = max(stats_widths[4], len(str(overall_stats["non_graduating"])))
-    stats_widths[5] = max(stats_widths[5], len(f"{overall_stats['percentage']:.1f}%"))
-
-    for col in [2, 3, 4, 5, 6]:
-        cell = stats_ws.cell(row=grand_total_row, column=col)
-        cell.font = Font(bold=True, color="FFFFFF")
-        cell.fill = header_fill
-
-    # Auto-size columns for statistics sheet
-    for idx, width in enumerate(stats_widths, 1):
-        adjusted_width = min(width + 2, 60)
-        stats_ws.column_dimensions[get_column_letter(idx)].width = adjusted_width
-
-    # Save the file
-    wb.save(excel_path)
+    if export_format in ("xlsx", "both"):
+        if segment_by_school is None:
+            segment_by_school = len(graduating_students) > SEGMENT_BY_SCHOOL_THRESHOLD
+
+        excel_path = _write_graduating_workbook(
+            output_dir,
+            timestamp,
+            graduating_students,
+            non_graduating_students,
+            graduation_stats,
+            segment_by_school,
+        )
 
-    click.secho(
-        f"Successfully exported graduating students to: {excel_path}", fg="green"
-    )
+        click.secho(
+            f"Successfully exported graduating students to: {excel_path}", fg="green"
+        )
 
     # Display summary
     click.echo(f"\nSummary:")
@@ -1212,18 +1512,31 @@ def export_graduating_students(
         f"- Overall graduation rate: {overall_stats['percentage']:.1f}% ({overall_stats['graduating']}/{overall_stats['expected']})"
     )
 
-    # Show breakdown by school
-    from collections import Counter
+    if quiet:
+        return
 
-    school_counts = Counter(student["school_name"] for student in graduating_students)
+    # Take the counts from graduation_stats rather than recounting students.
+    # Its schools and programs are in name order, the same order the students
+    # were sorted in, so equal counts still print in first-seen order.
+    school_counts = Counter(
+        {
+            school: totals["graduating"]
+            for school, totals in graduation_stats["school_totals"].items()
+            if totals["graduating"]
+        }
+    )
+    program_counts = Counter()
+    for programs in graduation_stats["school_program_stats"].values():
+        for program, stats in programs.items():
+            if stats["graduating"]:
+                program_counts[program] += stats["graduating"]
 
+    # Show breakdown by school
     click.echo(f"\nSchool breakdown:")
     for school, count in school_counts.most_common():
         click.echo(f"- {school}: {count} students")
 
     # Show breakdown by program
-    program_counts = Counter(student["program_name"] for student in graduating_students)
-
     click.echo(f"\nProgram breakdown:")
     for program, count in program_counts.most_common():
         click.echo(f"- {program}: {count} students")
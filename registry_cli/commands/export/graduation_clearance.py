@@ -1,12 +1,12 @@
 import os
 from datetime import datetime
+from itertools import groupby
 from typing import List, Optional
 
 import click
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill
 from openpyxl.utils import get_column_letter
-from sqlalchemy import and_, func
+from sqlalchemy import and_, case, distinct, func, select
 from sqlalchemy.orm import Session
 
 from registry_cli.models import (
@@ -20,6 +20,28 @@ from registry_cli.models import (
     Student,
     StudentProgram,
 )
+from registry_cli.utils.excel import (
+    BLACK_FILL,
+    BOLD_GREY,
+    BOLD_WHITE,
+    GREY_FILL,
+    column_width,
+    styled_cell,
+    warn_if_no_lxml,
+)
+
+# Receipt columns, and the payment types that are listed in a column of their own
+RECEIPT_KEYS = ("graduation_fee_receipts", "graduation_gown_receipts", "all_receipts")
+RECEIPT_KEYS_BY_PAYMENT_TYPE = {
+    "graduation_fee": "graduation_fee_receipts",
+    "graduation_gown": "graduation_gown_receipts",
+}
+
+
+def _receipt_list(receipt_no):
+    """Comma separated list of the distinct receipt numbers in a group."""
+    # SQLite only allows the default separator with DISTINCT
+    return func.replace(func.group_concat(distinct(receipt_no)), ",", ", ")
 
 
 def export_approved_graduation_students(db: Session) -> None:
@@ -43,51 +65,80 @@ def export_approved_graduation_students(db: Session) -> None:
 
     click.echo(f"Required departments: {required_departments}")
 
-    # Single optimized query to get all approved students with their details and payment receipts
-    query = (
-        db.query(
+    # Graduation requests cleared by every required department. Only the
+    # clearance tables are grouped; student details are joined to the result.
+    fully_approved_requests = (
+        select(GraduationClearance.graduation_request_id)
+        .join(Clearance, GraduationClearance.clearance_id == Clearance.id)
+        .where(
+            and_(
+                Clearance.status == "approved",
+                Clearance.department.in_(required_departments),
+            )
+        )
+        .group_by(GraduationClearance.graduation_request_id)
+        .having(func.count(func.distinct(Clearance.department)) == required_dept_count)
+        .subquery()
+    )
+
+    # Receipt numbers of each graduation request, aggregated in the database
+    # so that the receipts do not multiply the student rows
+    receipts = (
+        select(
+            PaymentReceipt.graduation_request_id,
+            *(
+                _receipt_list(
+                    case(
+                        (
+                            PaymentReceipt.payment_type == payment_type,
+                            PaymentReceipt.receipt_no,
+                        )
+                    )
+                ).label(receipt_key)
+                for payment_type, receipt_key in RECEIPT_KEYS_BY_PAYMENT_TYPE.items()
+            ),
+            _receipt_list(PaymentReceipt.receipt_no).label("all_receipts"),
+        )
+        .where(PaymentReceipt.receipt_no != "")
+        .group_by(PaymentReceipt.graduation_request_id)
+        .subquery()
+    )
+
+    # One query for the approved students, their details and receipts
+    stmt = (
+        select(
             GraduationRequest.id.label("graduation_request_id"),
             StudentProgram.std_no.label("student_number"),
             Student.name.label("student_name"),
             School.name.label("faculty"),
             Program.name.label("program_name"),
-            PaymentReceipt.receipt_no.label("receipt_no"),
-            PaymentReceipt.payment_type.label("payment_type"),
+            *(
+                func.coalesce(receipts.c[receipt_key], "N/A").label(receipt_key)
+                for receipt_key in RECEIPT_KEYS
+            ),
         )
         .select_from(GraduationRequest)
+        .join(
+            fully_approved_requests,
+            GraduationRequest.id == fully_approved_requests.c.graduation_request_id,
+        )
         .join(StudentProgram, GraduationRequest.student_program_id == StudentProgram.id)
         .join(Student, StudentProgram.std_no == Student.std_no)
         .join(Structure, StudentProgram.structure_id == Structure.id)
         .join(Program, Structure.program_id == Program.id)
         .join(School, Program.school_id == School.id)
-        .join(
-            GraduationClearance,
-            GraduationRequest.id == GraduationClearance.graduation_request_id,
-        )
-        .join(Clearance, GraduationClearance.clearance_id == Clearance.id)
-        .outerjoin(
-            PaymentReceipt, PaymentReceipt.graduation_request_id == GraduationRequest.id
-        )
-        .filter(
-            and_(
-                Clearance.status == "approved",
-                Clearance.department.in_(required_departments),
-            )
-        )
-        .group_by(
+        .outerjoin(receipts, GraduationRequest.id == receipts.c.graduation_request_id)
+        # Sort students by faculty (school name), program name, then student
+        # name (case-insensitive)
+        .order_by(
+            School.name,
+            func.lower(Program.name),
+            func.lower(Student.name),
             GraduationRequest.id,
-            StudentProgram.std_no,
-            Student.name,
-            School.code,
-            Program.name,
-            PaymentReceipt.receipt_no,
-            PaymentReceipt.payment_type,
         )
-        .having(func.count(func.distinct(Clearance.department)) == required_dept_count)
-        .order_by(GraduationRequest.id, PaymentReceipt.receipt_no)
     )
 
-    results = query.all()
+    results = db.execute(stmt).all()
 
     if not results:
         click.secho(
@@ -96,88 +147,7 @@ def export_approved_graduation_students(db: Session) -> None:
         )
         return
 
-    # Group results by graduation request to organize payment receipts
-    student_data = {}
-    for row in results:
-        grad_req_id = row.graduation_request_id
-
-        if grad_req_id not in student_data:
-            student_data[grad_req_id] = {
-                "graduation_request_id": grad_req_id,
-                "student_number": row.student_number,
-                "student_name": row.student_name,
-                "faculty": row.faculty,
-                "program_name": row.program_name,
-                "graduation_fee_receipts": [],
-                "graduation_gown_receipts": [],
-                "all_receipts": [],
-            }
-
-        # Add payment receipt if it exists
-        if row.receipt_no:
-            if row.payment_type == "graduation_fee":
-                student_data[grad_req_id]["graduation_fee_receipts"].append(
-                    row.receipt_no
-                )
-            elif row.payment_type == "graduation_gown":
-                student_data[grad_req_id]["graduation_gown_receipts"].append(
-                    row.receipt_no
-                )
-            student_data[grad_req_id]["all_receipts"].append(row.receipt_no)
-
-    # Convert to list and format receipt numbers
-    approved_students = []
-    for student in student_data.values():
-        # Remove duplicates and format receipt strings
-        student["graduation_fee_receipts"] = list(
-            set(student["graduation_fee_receipts"])
-        )
-        student["graduation_gown_receipts"] = list(
-            set(student["graduation_gown_receipts"])
-        )
-        student["all_receipts"] = list(set(student["all_receipts"]))
-
-        approved_students.append(
-            {
-                "graduation_request_id": student["graduation_request_id"],
-                "student_number": student["student_number"],
-                "student_name": student["student_name"],
-                "faculty": student["faculty"],
-                "program_name": student["program_name"],
-                "graduation_fee_receipts": (
-                    ", ".join(student["graduation_fee_receipts"])
-                    if student["graduation_fee_receipts"]
-                    else "N/A"
-                ),
-                "graduation_gown_receipts": (
-                    ", ".join(student["graduation_gown_receipts"])
-                    if student["graduation_gown_receipts"]
-                    else "N/A"
-                ),
-                "all_receipts": (
-                    ", ".join(student["all_receipts"])
-                    if student["all_receipts"]
-                    else "N/A"
-                ),
-            }
-        )
-
-    if not approved_students:
-        click.secho("No valid students found after processing.", fg="yellow")
-        return
-
-    click.echo(
-        f"Found {len(approved_students)} students with full departmental approval"
-    )
-
-    # Sort students by faculty (school code), program name, then student name (case-insensitive)
-    approved_students.sort(
-        key=lambda x: (
-            x.get("faculty") or "",
-            (x.get("program_name") or "").lower(),
-            (x.get("student_name") or "").lower(),
-        )
-    )
+    click.echo(f"Found {len(results)} students with full departmental approval")
 
     # Export to Excel
     output_dir = "exports"
@@ -187,12 +157,10 @@ def export_approved_graduation_students(db: Session) -> None:
     excel_filename = f"approved_graduation_clearance_{timestamp}.xlsx"
     excel_path = os.path.join(output_dir, excel_filename)
 
-    wb = Workbook()
-    ws = wb.active
-    if ws is None:
-        ws = wb.create_sheet("Approved Graduation Students")
-    else:
-        ws.title = "Approved Graduation Students"
+    warn_if_no_lxml()
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Approved Graduation Students")
 
     # Set up headers
     headers = [
@@ -206,121 +174,120 @@ def export_approved_graduation_students(db: Session) -> None:
         "Graduation Request ID",
     ]
 
-    header_font = Font(bold=True, color="FFFFFF")
-    # Use black header fill to match graduating_students.py
-    header_fill = PatternFill(
-        start_color="000000", end_color="000000", fill_type="solid"
-    )
+    rows = [
+        (
+            student.student_number,
+            student.student_name,
+            student.faculty,
+            student.program_name,
+            student.graduation_fee_receipts,
+            student.graduation_gown_receipts,
+            student.all_receipts,
+            student.graduation_request_id,
+        )
+        for student in results
+    ]
+
+    # Auto-size columns from the header and data rows
+    for col, (header, column_values) in enumerate(zip(headers, zip(*rows)), 1):
+        adjusted_width = min(column_width(header, column_values) + 2, 50)
+        ws.column_dimensions[get_column_letter(col)].width = adjusted_width
 
-    for col, header in enumerate(headers, 1):
-        # assign value directly to avoid MergedCell .value assignment issues
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
+    ws.append([styled_cell(ws, header, BOLD_WHITE, BLACK_FILL) for header in headers])
 
     # Add data rows
-    for row, student in enumerate(approved_students, 2):
-        ws.cell(row=row, column=1, value=student["student_number"])
-        ws.cell(row=row, column=2, value=student["student_name"])
-        ws.cell(row=row, column=3, value=student["faculty"])
-        ws.cell(row=row, column=4, value=student["program_name"])
-        ws.cell(row=row, column=5, value=student["graduation_fee_receipts"])
-        ws.cell(row=row, column=6, value=student["graduation_gown_receipts"])
-        ws.cell(row=row, column=7, value=student["all_receipts"])
-        ws.cell(row=row, column=8, value=student["graduation_request_id"])
-
-    # Auto-size columns
-    for col in range(1, len(headers) + 1):
-        column_letter = get_column_letter(col)
-        max_length = 0
-        for row in ws[column_letter]:
-            try:
-                if len(str(row.value)) > max_length:
-                    max_length = len(str(row.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
+    for row_values in rows:
+        ws.append(row_values)
 
     # Create School & Program Breakdown sheet (program counts per faculty)
     breakdown_ws = wb.create_sheet("School & Program Breakdown")
 
-    from collections import defaultdict
-
-    school_program_stats = defaultdict(lambda: defaultdict(int))
-    school_totals = defaultdict(int)
+    from collections import Counter
 
-    for student in approved_students:
-        school = student["faculty"]
-        program = student["program_name"]
-        school_program_stats[school][program] += 1
+    # Student counts keyed by (school, program) in one flat Counter
+    school_program_counts = Counter()
+    school_totals = Counter()
+    # Summary counts are gathered in the same pass over the students
+    program_counts = Counter()
+    students_with_fee_receipts = 0
+    students_with_gown_receipts = 0
+    students_with_any_receipts = 0
+
+    for student in results:
+        school = student.faculty
+        program = student.program_name
+        school_program_counts[(school, program)] += 1
         school_totals[school] += 1
-
-    # Set up breakdown sheet headers
+        program_counts[program] += 1
+        if student.graduation_fee_receipts != "N/A":
+            students_with_fee_receipts += 1
+        if student.graduation_gown_receipts != "N/A":
+            students_with_gown_receipts += 1
+        if student.all_receipts != "N/A":
+            students_with_any_receipts += 1
+
+    # Sorting the (school, program) keys orders schools and their programs
+    breakdown_counts = sorted(school_program_counts.items())
+
+    # Auto-size breakdown columns before any row is written
     breakdown_headers = ["School/Faculty", "Program", "Student Count"]
     breakdown_widths = [len(h) for h in breakdown_headers]
-    for col, header in enumerate(breakdown_headers, 1):
-        cell = breakdown_ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        # ensure breakdown header uses black fill
-        cell.fill = header_fill
-
-    # Add breakdown data grouped by school
-    row = 2
-    for school in sorted(school_program_stats.keys()):
-        # Add school header row spanning three columns
-        for col in range(1, 4):
-            if col == 1:
-                cell = breakdown_ws.cell(row=row, column=col, value=school)
-                breakdown_widths[0] = max(breakdown_widths[0], len(str(school)))
-            else:
-                cell = breakdown_ws.cell(row=row, column=col)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(
-                start_color="444444", end_color="444444", fill_type="solid"
-            )
+    breakdown_widths[1] = max(breakdown_widths[1], len("Total"), len("GRAND TOTAL"))
+    breakdown_widths[2] = max(breakdown_widths[2], len(str(len(results))))
+    for school, total in school_totals.items():
+        breakdown_widths[0] = max(breakdown_widths[0], len(str(school)))
+        breakdown_widths[2] = max(breakdown_widths[2], len(str(total)))
+    for (_, program), count in breakdown_counts:
+        breakdown_widths[1] = max(breakdown_widths[1], len(str(program)))
+        breakdown_widths[2] = max(breakdown_widths[2], len(str(count)))
+
+    for idx, width in enumerate(breakdown_widths, 1):
+        adjusted_width = min(width + 2, 60)
+        breakdown_ws.column_dimensions[get_column_letter(idx)].width = adjusted_width
+
+    # Set up breakdown sheet headers
+    breakdown_ws.append(
+        [
+            styled_cell(breakdown_ws, h, BOLD_WHITE, BLACK_FILL)
+            for h in breakdown_headers
+        ]
+    )
+
+    # Add breakdown data grouped by school. Write-only sheets do not track
+    # rows, so the row number is counted for merging the school headers.
+    row = 1
+    for school, school_counts in groupby(breakdown_counts, key=lambda item: item[0][0]):
+        # Add school header row spanning three columns; only its first cell is
+        # written, and the merged columns show its fill
         row += 1
+        breakdown_ws.append([styled_cell(breakdown_ws, school, BOLD_WHITE, GREY_FILL)])
+        breakdown_ws.merged_cells.add(f"A{row}:C{row}")
 
         # Add programs for this school
-        programs = sorted(school_program_stats[school].keys())
-        for program in programs:
-            count = school_program_stats[school][program]
-            breakdown_ws.cell(row=row, column=1, value="")
-            breakdown_ws.cell(row=row, column=2, value=program)
-            breakdown_ws.cell(row=row, column=3, value=count)
-            breakdown_widths[1] = max(breakdown_widths[1], len(str(program)))
-            breakdown_widths[2] = max(breakdown_widths[2], len(str(count)))
+        for (_, program), count in school_counts:
+            breakdown_ws.append(("", program, count))
             row += 1
 
         # Add school total
-        total_cell = breakdown_ws.cell(row=row, column=2, value="Total")
-        total_cell.font = Font(bold=True, color="444444")
-
-        total_count_cell = breakdown_ws.cell(
-            row=row, column=3, value=school_totals[school]
+        breakdown_ws.append(
+            [None]
+            + [
+                styled_cell(breakdown_ws, value, BOLD_GREY)
+                for value in ("Total", school_totals[school])
+            ]
         )
-        total_count_cell.font = Font(bold=True, color="444444")
-        breakdown_widths[1] = max(breakdown_widths[1], len("Total"))
-        breakdown_widths[2] = max(breakdown_widths[2], len(str(school_totals[school])))
 
+        breakdown_ws.append([])  # Add space between schools
         row += 2
 
     # Add grand total
-    grand_total_row = row
-    breakdown_ws.cell(row=grand_total_row, column=2, value="GRAND TOTAL")
-    breakdown_ws.cell(row=grand_total_row, column=3, value=len(approved_students))
-    breakdown_widths[1] = max(breakdown_widths[1], len("GRAND TOTAL"))
-    breakdown_widths[2] = max(breakdown_widths[2], len(str(len(approved_students))))
-
-    for col in [2, 3]:
-        cell = breakdown_ws.cell(row=grand_total_row, column=col)
-        cell.font = Font(bold=True, color="FFFFFF")
-        cell.fill = header_fill
-
-    # Auto-size breakdown columns
-    for idx, width in enumerate(breakdown_widths, 1):
-        adjusted_width = min(width + 2, 60)
-        breakdown_ws.column_dimensions[get_column_letter(idx)].width = adjusted_width
+    breakdown_ws.append(
+        [None]
+        + [
+            styled_cell(breakdown_ws, value, BOLD_WHITE, BLACK_FILL)
+            for value in ("GRAND TOTAL", len(results))
+        ]
+    )
 
     # Save the file
     wb.save(excel_path)
@@ -332,35 +299,19 @@ def export_approved_graduation_students(db: Session) -> None:
 
     # Display summary
     click.echo(f"\nSummary:")
-    click.echo(
-        f"- Total students with full departmental approval: {len(approved_students)}"
-    )
+    click.echo(f"- Total students with full departmental approval: {len(results)}")
 
     # Show breakdown by faculty
-    from collections import Counter
-
-    faculty_counts = Counter(student["faculty"] for student in approved_students)
     click.echo(f"\nFaculty breakdown:")
-    for faculty, count in faculty_counts.most_common():
+    for faculty, count in school_totals.most_common():
         click.echo(f"- {faculty}: {count} students")
 
     # Show breakdown by program
-    program_counts = Counter(student["program_name"] for student in approved_students)
     click.echo(f"\nProgram breakdown:")
     for program, count in program_counts.most_common():
         click.echo(f"- {program}: {count} students")
 
     # Show payment receipt statistics
-    students_with_fee_receipts = sum(
-        1 for s in approved_students if s["graduation_fee_receipts"] != "N/A"
-    )
-    students_with_gown_receipts = sum(
-        1 for s in approved_students if s["graduation_gown_receipts"] != "N/A"
-    )
-    students_with_any_receipts = sum(
-        1 for s in approved_students if s["all_receipts"] != "N/A"
-    )
-
     click.echo(f"\nPayment receipt statistics:")
     click.echo(f"- Students with graduation fee receipts: {students_with_fee_receipts}")
     click.echo(
@@ -368,5 +319,5 @@ def export_approved_graduation_students(db: Session) -> None:
     )
     click.echo(f"- Students with any payment receipts: {students_with_any_receipts}")
     click.echo(
-        f"- Students without payment receipts: {len(approved_students) - students_with_any_receipts}"
+        f"- Students without payment receipts: {len(results) - students_with_any_receipts}"
     )
@@ -1,11 +1,10 @@
 import csv
 import os
-from collections import defaultdict
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import List, Tuple
 
 import click
-from sqlalchemy import func
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from registry_cli.models import (
@@ -21,39 +20,38 @@ from registry_cli.models import (
 def export_program_registrations(db: Session) -> None:
     """Export registration statistics by program and semester to CSV files."""
 
-    # Query to get all registered students grouped by program and semester
-    query = (
-        db.query(
-            Program.name.label("program_name"),
-            RegistrationRequest.semester_number,
-            func.count(RegistrationRequest.std_no.distinct()).label("student_count"),
-        )
+    # Registered students in their active programs
+    registered = (
+        select(RegistrationRequest.semester_number)
         .join(Student, RegistrationRequest.std_no == Student.std_no)
         .join(StudentProgram, Student.std_no == StudentProgram.std_no)
         .join(Structure, StudentProgram.structure_id == Structure.id)
         .join(Program, Structure.program_id == Program.id)
-        .filter(RegistrationRequest.status == "registered")
-        .filter(StudentProgram.status == "Active")
-        .group_by(Program.name, RegistrationRequest.semester_number)
-        .order_by(Program.name, RegistrationRequest.semester_number)
+        .where(RegistrationRequest.status == "registered")
+        .where(StudentProgram.status == "Active")
     )
 
-    results = query.all()
+    # First pass: the semesters that become the CSV columns
+    sorted_semesters = db.scalars(
+        registered.distinct().order_by(RegistrationRequest.semester_number)
+    ).all()
 
-    if not results:
+    if not sorted_semesters:
         click.secho("No registered students found.", fg="yellow")
         return
+    semester_columns = {semester: i for i, semester in enumerate(sorted_semesters)}
 
-    # Group results by program
-    program_data: Dict[str, Dict[int, int]] = defaultdict(dict)
-    all_semesters = set()
-
-    for program_name, semester_number, student_count in results:
-        program_data[program_name][semester_number] = student_count
-        all_semesters.add(semester_number)
-
-    # Sort semesters for consistent output
-    sorted_semesters = sorted(all_semesters)
+    # Second pass: student counts grouped by program and semester, streamed in
+    # program order so each program's row is written as soon as it is complete
+    stmt = (
+        registered.with_only_columns(
+            Program.name.label("program_name"),
+            RegistrationRequest.semester_number,
+            func.count(RegistrationRequest.std_no.distinct()).label("student_count"),
+        )
+        .group_by(Program.name, RegistrationRequest.semester_number)
+        .order_by(Program.name, RegistrationRequest.semester_number)
+    )
 
     # Create output directory
     output_dir = "exports"
@@ -66,19 +64,32 @@ def export_program_registrations(db: Session) -> None:
     csv_filename = f"program_registrations_{timestamp}.csv"
     csv_path = os.path.join(output_dir, csv_filename)
 
+    program_totals: List[Tuple[str, int]] = []
     with open(csv_path, "w", newline="", encoding="utf-8") as csvfile:
         writer = csv.writer(csvfile)
 
         # Write header
         header = ["program_name"] + [f"semester_{sem}" for sem in sorted_semesters]
         writer.writerow(header)
+
+        def write_program(program_name: str, row: List[int]) -> None:
+            writer.writerow([program_name, *map(str, row)])
+            program_totals.append((program_name, sum(row)))
+
         # Write data for each program
-        for program_name in sorted(program_data.keys()):
-            row = [program_name]
-            for semester in sorted_semesters:
-                student_count = program_data[program_name].get(semester, 0)
-                row.append(str(student_count))
-            writer.writerow(row)
+        current_program = None
+        row = [0] * len(sorted_semesters)
+        for program_name, semester_number, student_count in db.execute(stmt).yield_per(
+            1000
+        ):
+            if program_name != current_program:
+                if current_program is not None:
+                    write_program(current_program, row)
+                current_program = program_name
+                row = [0] * len(sorted_semesters)
+            row[semester_columns[semester_number]] = student_count
+        if current_program is not None:
+            write_program(current_program, row)
 
     click.secho(
         f"Successfully exported program registration statistics to: {csv_path}",
@@ -87,14 +98,11 @@ def export_program_registrations(db: Session) -> None:
 
     # Print summary
     click.echo(f"\nSummary:")
-    click.echo(f"- Total programs: {len(program_data)}")
+    click.echo(f"- Total programs: {len(program_totals)}")
     click.echo(f"- Semester range: {min(sorted_semesters)} to {max(sorted_semesters)}")
-    click.echo(
-        f"- Total registrations: {sum(sum(semester_data.values()) for semester_data in program_data.values())}"
-    )
+    click.echo(f"- Total registrations: {sum(total for _, total in program_totals)}")
 
     # Show program breakdown
     click.echo(f"\nProgram breakdown:")
-    for program_name in sorted(program_data.keys()):
-        total_students = sum(program_data[program_name].values())
+    for program_name, total_students in program_totals:
         click.echo(f"- {program_name}: {total_students} registrations")
@@ -1,12 +1,12 @@
 import os
 from collections import defaultdict
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 import click
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill
 from openpyxl.utils import get_column_letter
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from registry_cli.models import (
@@ -17,12 +17,27 @@ from registry_cli.models import (
     Student,
     StudentProgram,
 )
+from registry_cli.utils.excel import (
+    BLUE_FILL,
+    BOLD_WHITE,
+    column_width,
+    styled_cell,
+)
+
+# YnSm labels of semester numbers 1 to 32, looked up instead of formatted per row
+SEMESTER_LABELS = tuple(
+    f"Y{((number - 1) // 2) + 1}S{((number - 1) % 2) + 1}" for number in range(1, 33)
+)
+
+HEADERS = ("Student Name", "Student Number", "Program", "Semester")
 
 
 def format_semester(semester_number: int) -> str:
     """Format semester number to YnSm format (e.g., 1 -> Y1S1, 2 -> Y1S2, 3 -> Y2S1)."""
     if not semester_number or semester_number < 1:
         return f"Y1S1"
+    if semester_number <= len(SEMESTER_LABELS):
+        return SEMESTER_LABELS[semester_number - 1]
 
     year = ((semester_number - 1) // 2) + 1
     semester = ((semester_number - 1) % 2) + 1
@@ -31,43 +46,65 @@ def format_semester(semester_number: int) -> str:
 
 def export_students_by_school(db: Session) -> None:
     """Export registered students grouped by school to Excel with separate sheets."""
-    # Query to get all registered students with their school information
+    # Query to get all registered students with their school information, at
+    # the latest semester they registered for. A student with several active
+    # programs in a school is listed once, under the last program by name.
     # Joins: RegistrationRequest -> Student -> StudentProgram -> Structure -> Program -> School
-    query = (
-        db.query(
+    program_rows = (
+        select(
             School.code.label("school_code"),
             Student.name.label("student_name"),
             Student.std_no,
-            RegistrationRequest.semester_number,
+            func.max(RegistrationRequest.semester_number).label("semester_number"),
             Program.name.label("program_name"),
+            func.row_number()
+            .over(
+                partition_by=(School.code, Student.std_no),
+                order_by=Program.name.desc(),
+            )
+            .label("program_rank"),
         )
+        .select_from(RegistrationRequest)
         .join(Student, RegistrationRequest.std_no == Student.std_no)
         .join(StudentProgram, Student.std_no == StudentProgram.std_no)
         .join(Structure, StudentProgram.structure_id == Structure.id)
         .join(Program, Structure.program_id == Program.id)
         .join(School, Program.school_id == School.id)
-        .filter(RegistrationRequest.status == "registered")
-        .filter(StudentProgram.status == "Active")
-        .distinct()
-        .order_by(School.code, Program.name, RegistrationRequest.semester_number)
+        .where(RegistrationRequest.status == "registered")
+        .where(StudentProgram.status == "Active")
+        .group_by(School.code, Student.name, Student.std_no, Program.name)
+        .subquery()
+    )
+    stmt = (
+        select(
+            program_rows.c.school_code,
+            program_rows.c.student_name,
+            program_rows.c.std_no,
+            program_rows.c.semester_number,
+            program_rows.c.program_name,
+        )
+        .where(program_rows.c.program_rank == 1)
+        .order_by(
+            program_rows.c.school_code,
+            program_rows.c.program_name,
+            program_rows.c.semester_number,
+        )
     )
 
-    results = query.all()
+    results = db.execute(stmt).all()
 
     if not results:
         click.secho("No registered students found.", fg="yellow")
         return
 
-    school_data: Dict[str, Dict[int, Dict]] = defaultdict(dict)
+    # Rows arrive sorted by school, program then semester number, and are kept
+    # as the sheet rows: name, student number, program and semester
+    school_data: Dict[str, List[Tuple[str, int, str, str]]] = defaultdict(list)
 
     for school_code, student_name, std_no, semester_number, program_name in results:
-        school_data[school_code][std_no] = {
-            "name": student_name,
-            "student_number": std_no,
-            "semester": format_semester(semester_number),
-            "program": program_name,
-            "semester_order": semester_number,
-        }
+        school_data[school_code].append(
+            (student_name, std_no, program_name, format_semester(semester_number))
+        )
 
     output_dir = "exports"
     os.makedirs(output_dir, exist_ok=True)
@@ -76,24 +113,13 @@ def export_students_by_school(db: Session) -> None:
     excel_filename = f"students_by_school_{timestamp}.xlsx"
     excel_path = os.path.join(output_dir, excel_filename)
 
-    wb = Workbook()
-    if wb.active:
-        wb.remove(wb.active)
+    wb = Workbook(write_only=True)
 
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(
-        start_color="366092", end_color="366092", fill_type="solid"
-    )
     total_students = 0
 
     for school_code in sorted(school_data.keys()):
-        students_dict = school_data[school_code]
-        students = list(students_dict.values())
-
-        # Sort students by program then by semester number
-        students.sort(key=lambda x: (x["program"], x["semester_order"]))
-
-        total_students += len(students)
+        rows = school_data[school_code]
+        total_students += len(rows)
 
         safe_sheet_name = school_code[:31]
         if safe_sheet_name in [ws.title for ws in wb.worksheets]:
@@ -101,31 +127,17 @@ def export_students_by_school(db: Session) -> None:
 
         ws = wb.create_sheet(title=safe_sheet_name)
 
-        headers = ["Student Name", "Student Number", "Program", "Semester"]
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col)
-            cell.value = header
-            cell.font = header_font
-            cell.fill = header_fill
-
-        for row, student in enumerate(students, 2):
-            ws.cell(row=row, column=1, value=student["name"])
-            ws.cell(row=row, column=2, value=student["student_number"])
-            ws.cell(row=row, column=3, value=student["program"])
-            ws.cell(row=row, column=4, value=student["semester"])
-
-        for col in range(1, len(headers) + 1):
-            column_letter = get_column_letter(col)
-            ws.column_dimensions[column_letter].auto_size = True
-            max_length = 0
-            for row in ws[column_letter]:
-                try:
-                    if len(str(row.value)) > max_length:
-                        max_length = len(str(row.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
+        # Auto-size columns from the header and data rows
+        for col, (header, column_values) in enumerate(zip(HEADERS, zip(*rows)), 1):
+            adjusted_width = min(column_width(header, column_values) + 2, 50)
+            ws.column_dimensions[get_column_letter(col)].width = adjusted_width
+
+        ws.append(
+            [styled_cell(ws, header, BOLD_WHITE, BLUE_FILL) for header in HEADERS]
+        )
+
+        for row_values in rows:
+            ws.append(row_values)
 
     wb.save(excel_path)
 
@@ -1,5 +1,6 @@
 from datetime import datetime
-from typing import Any, Dict, List
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
 
 import click
 from sqlalchemy.orm import Session
@@ -32,6 +33,18 @@ def modules_pull(db: Session) -> None:
         click.secho(f"Error pulling modules: {str(e)}", fg="red", err=True)
 
 
+@lru_cache(maxsize=4096)
+def _date_to_ts(date_stamp: str) -> Optional[int]:
+    """Convert a YYYY-MM-DD date stamp to a Unix timestamp, or None if invalid.
+
+    Cached because date stamps repeat heavily across a page of modules.
+    """
+    try:
+        return int(datetime.strptime(date_stamp, "%Y-%m-%d").timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
 def save_modules(db: Session, modules: List[Dict[str, Any]]) -> None:
     """Save or update modules in the database.
 
@@ -39,54 +52,51 @@ def save_modules(db: Session, modules: List[Dict[str, Any]]) -> None:
         db: Database session
         modules: List of module dictionaries with module data
     """
-    total_created = 0
+    # Look up which of the page's modules already exist with a single query
+    module_ids = [module_data["id"] for module_data in modules]
+    existing_ids = {
+        module_id
+        for (module_id,) in db.query(Module.id).filter(Module.id.in_(module_ids))
+    }
+
+    # Modules to insert are keyed by id so a module listed twice on a page is
+    # inserted once, with its later listing applied as an update
+    inserts: Dict[int, Dict[str, Any]] = {}
+    updates: List[Dict[str, Any]] = []
     total_updated = 0
-
+    now_ts = int(datetime.now().timestamp())
     for module_data in modules:
-        module = db.query(Module).filter(Module.id == module_data["id"]).first()
-
-        try:
-            date_obj = datetime.strptime(module_data["date_stamp"], "%Y-%m-%d")
-            timestamp = int(date_obj.timestamp())
-        except:
-            timestamp = int(datetime.now().timestamp())
-
-        if module:
-            module.code = module_data["code"]
-            module.name = module_data["name"]
-            if hasattr(module, "status") and "status" in module_data:
-                module.status = module_data["status"]
-            module.timestamp = timestamp
+        timestamp = _date_to_ts(module_data.get("date_stamp")) or now_ts
+
+        mapping = {
+            "id": module_data["id"],
+            "code": module_data["code"],
+            "name": module_data["name"],
+            "timestamp": timestamp,
+        }
+        if "status" in module_data:
+            mapping["status"] = module_data["status"]
+
+        module_id = mapping["id"]
+        if module_id in existing_ids:
+            updates.append(mapping)
+            total_updated += 1
+        elif module_id in inserts:
+            inserts[module_id].update(mapping)
             total_updated += 1
         else:
-            new_module_data = {
-                "id": module_data["id"],
-                "code": module_data["code"],
-                "name": module_data["name"],
-                "timestamp": timestamp,
-            }
-            if "status" in module_data:
-                new_module_data["status"] = module_data["status"]
-
-            module = Module(**new_module_data)
-            db.add(module)
-            total_created += 1
-
-        if (total_created + total_updated) % 50 == 0:
-            try:
-                db.commit()
-                click.echo(
-                    f"Progress: {total_created + total_updated} modules processed"
-                )
-            except Exception as e:
-                db.rollback()
-                click.secho(f"Error committing batch: {str(e)}", fg="red", err=True)
+            inserts[module_id] = mapping
+
+    total_created = len(inserts)
 
+    # One bulk INSERT and one bulk UPDATE per page, committed together
     try:
+        db.bulk_insert_mappings(Module, list(inserts.values()))
+        db.bulk_update_mappings(Module, updates)
         db.commit()
     except Exception as e:
         db.rollback()
-        click.secho(f"Error committing final batch: {str(e)}", fg="red", err=True)
+        click.secho(f"Error committing modules: {str(e)}", fg="red", err=True)
 
     click.secho(
         f"Created {total_created} new modules and updated {total_updated} existing modules",
@@ -1,6 +1,9 @@
+import re
 import uuid
+from typing import Any, Dict, List
 
 import click
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
 from registry_cli.browser import BASE_URL
@@ -8,14 +11,31 @@ from registry_cli.models import Program, School
 from registry_cli.scrapers.program import ProgramScraper
 from registry_cli.scrapers.schools import SchoolScraper
 
+# Program name prefixes that mark a level; any other program is a degree
+PROGRAM_LEVEL_PREFIX = re.compile(r"certificate|diploma|associate", re.IGNORECASE)
+LEVEL_BY_PREFIX = {
+    "certificate": "certificate",
+    "diploma": "diploma",
+    "associate": "diploma",
+}
+
+
+def _program_level(program_name: str) -> str:
+    """Infer a program's level from the start of its name."""
+    match = PROGRAM_LEVEL_PREFIX.match(program_name)
+    return LEVEL_BY_PREFIX[match.group().lower()] if match else "degree"
+
+
+def program_list_url(school_id: int) -> str:
+    return f"{BASE_URL}/f_programlist.php?showmaster=1&SchoolID={school_id}"
+
 
 def program_pull(db: Session, school_id: int) -> None:
     if not school_id:
         raise ValueError("School ID is required.")
 
     read_or_create_school(db, school_id)
-    url = f"{BASE_URL}/f_programlist.php?showmaster=1&SchoolID={school_id}"
-    scraper = ProgramScraper(url)
+    scraper = ProgramScraper(program_list_url(school_id))
 
     try:
         programs_data = scraper.scrape()
@@ -23,52 +43,11 @@ def program_pull(db: Session, school_id: int) -> None:
             click.echo("No programs found.")
             return
 
-        updated_count = 0
-        added_count = 0
-        processed_programs = []
-        
-        for program_data in programs_data:
-            program_id = int(program_data["program_id"])
-            program = db.query(Program).filter(Program.id == program_id).first()
-
-            program_name: str = program_data["name"]
-            program_level = None
-
-            if program_name.lower().startswith("certificate"):
-                program_level = "certificate"
-            elif program_name.lower().startswith(
-                "diploma"
-            ) or program_name.lower().startswith("associate"):
-                program_level = "diploma"
-            else:
-                program_level = "degree"
-
-            if program:
-                program.code = program_data["code"]
-                program.name = program_name
-                program.school_id = school_id
-                program.level = program_level
-                updated_count += 1
-            else:
-                program = Program(
-                    id=program_id,
-                    code=program_data["code"],
-                    name=program_name,
-                    school_id=school_id,
-                    level=program_level,
-                )
-                db.add(program)
-                added_count += 1
-            
-            processed_programs.append(program_id)
-
-        db.commit()
-        click.echo(
-            f"Successfully updated {updated_count} and added {added_count} programs to the database."
-        )
+        processed_programs = save_programs(db, school_id, programs_data)
 
         click.echo("\nPulling structures for programs...")
         from registry_cli.commands.pull.structures import structure_pull
+
         for program_id in processed_programs:
             click.echo(f"\nPulling structures for program {program_id}...")
             structure_pull(db, program_id)
@@ -78,24 +57,82 @@ def program_pull(db: Session, school_id: int) -> None:
         click.secho(f"Error pulling programs: {str(e)}", fg="red")
 
 
+def save_programs(
+    db: Session, school_id: int, programs_data: List[Dict[str, Any]]
+) -> List[int]:
+    """Save or update the scraped programs of a school.
+
+    Returns:
+        The ids of the saved programs, in scraped order.
+    """
+    # Look up which of the scraped programs already exist with a single query
+    program_ids = [int(program_data["program_id"]) for program_data in programs_data]
+    existing_ids = {
+        program_id
+        for (program_id,) in db.query(Program.id).filter(Program.id.in_(program_ids))
+    }
+
+    rows = []
+    updated_count = 0
+    for program_data in programs_data:
+        program_id = int(program_data["program_id"])
+        program_name: str = program_data["name"]
+        rows.append(
+            {
+                "id": program_id,
+                "code": program_data["code"],
+                "name": program_name,
+                "school_id": school_id,
+                "level": _program_level(program_name),
+            }
+        )
+        if program_id in existing_ids:
+            updated_count += 1
+        else:
+            existing_ids.add(program_id)
+    added_count = len(rows) - updated_count
+
+    # Insert new programs and update existing ones in a single statement
+    stmt = sqlite_insert(Program).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Program.id],
+        set_={
+            "code": stmt.excluded.code,
+            "name": stmt.excluded.name,
+            "school_id": stmt.excluded.school_id,
+            "level": stmt.excluded.level,
+        },
+    )
+    db.execute(stmt)
+    db.commit()
+    click.echo(
+        f"Successfully updated {updated_count} and added {added_count} programs to the database."
+    )
+    return program_ids
+
+
 def read_or_create_school(db: Session, school_id: int):
-    school = db.query(School).filter(School.id == school_id).first()
+    school = db.get(School, school_id)
     if not school:
         scraper = SchoolScraper(f"{BASE_URL}/f_schoollist.php?cmd=resetall")
         schools_data = scraper.scrape()
         if not schools_data:
             click.echo("No schools found.")
             return
-        for school_data in schools_data:
-            school = School(
-                id=int(school_data["school_id"]),
-                code=school_data["code"],
-                name=school_data["name"],
-            )
-            db.add(school)
+        db.bulk_insert_mappings(
+            School,
+            [
+                {
+                    "id": int(school_data["school_id"]),
+                    "code": school_data["code"],
+                    "name": school_data["name"],
+                }
+                for school_data in schools_data
+            ],
+        )
         db.commit()
         click.echo(f"Successfully added {len(schools_data)} schools.")
-    school = db.query(School).filter(School.id == school_id).first()
+    school = db.get(School, school_id)
     if not school:
         raise ValueError(f"School with ID {school_id} not found. even after scraping")
     return school
@@ -1,14 +1,18 @@
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 import click
 from sqlalchemy.orm import Session
 
 from registry_cli.browser import BASE_URL
-from registry_cli.commands.pull.programs import program_pull
+from registry_cli.commands.pull.programs import program_list_url, save_programs
 from registry_cli.commands.pull.structures import structure_pull
 from registry_cli.models import Program, School
+from registry_cli.scrapers.program import ProgramScraper
 from registry_cli.scrapers.schools import SchoolScraper
 
+MAX_WORKERS = 8
+
 
 def school_pull(db: Session) -> None:
     url = f"{BASE_URL}/f_schoollist.php?cmd=resetall"
@@ -24,7 +28,7 @@ def school_pull(db: Session) -> None:
         added_count = 0
         for school_data in schools_data:
             school_id = int(school_data["school_id"])
-            school = db.query(School).filter(School.id == school_id).first()
+            school = db.get(School, school_id)
 
             if school:
                 school.code = school_data["code"]
@@ -39,17 +43,43 @@ def school_pull(db: Session) -> None:
                 db.add(school)
                 added_count += 1
 
-            # Pull programs for this school
-            click.echo(f"\nPulling programs for school {school_data['name']}...")
-            program_pull(db, school_id)
+        db.commit()
 
-            # Pull structures for each program
-            programs = db.query(Program).filter(Program.school_id == school_id).all()
-            for program in programs:
-                click.echo(f"\nPulling structures for program {program.name}...")
-                structure_pull(db, program.id)
+        # Program lists are scraped concurrently, since the requests are
+        # network bound; they are saved one school at a time on this thread
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            program_futures = {
+                int(school_data["school_id"]): executor.submit(
+                    ProgramScraper(
+                        program_list_url(int(school_data["school_id"]))
+                    ).scrape
+                )
+                for school_data in schools_data
+            }
+
+            for school_data in schools_data:
+                school_id = int(school_data["school_id"])
+
+                # Pull programs for this school
+                click.echo(f"\nPulling programs for school {school_data['name']}...")
+                try:
+                    programs_data = program_futures[school_id].result()
+                    if programs_data:
+                        save_programs(db, school_id, programs_data)
+                    else:
+                        click.echo("No programs found.")
+                except Exception as e:
+                    db.rollback()
+                    click.secho(f"Error pulling programs: {str(e)}", fg="red")
+
+                # Pull structures for each program
+                programs = (
+                    db.query(Program).filter(Program.school_id == school_id).all()
+                )
+                for program in programs:
+                    click.echo(f"\nPulling structures for program {program.name}...")
+                    structure_pull(db, program.id)
 
-        db.commit()
         click.echo(f"\nSummary:")
         click.echo(f"- Updated {updated_count} and added {added_count} schools")
 
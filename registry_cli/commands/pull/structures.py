@@ -2,6 +2,8 @@ from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
 
 import click
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
 from registry_cli.browser import BASE_URL
@@ -38,30 +40,43 @@ class StructureDataProcessor:
         self, modules_data: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
         """Validate and process module data, ensuring all referenced modules exist."""
+        # Numeric codes are module ids, anything else a module code. Both are
+        # looked up with one IN query each instead of a query per module.
+        codes = {module_data["code"] for module_data in modules_data}
+        module_ids = {int(code) for code in codes if code.isdigit()}
+        module_codes = {code for code in codes if not code.isdigit()}
+
+        existing_ids = set()
+        if module_ids:
+            existing_ids = set(
+                self.db.scalars(select(Module.id).where(Module.id.in_(module_ids)))
+            )
+        ids_by_code: Dict[str, int] = {}
+        if module_codes:
+            for code, module_id in self.db.execute(
+                select(Module.code, Module.id)
+                .where(Module.code.in_(module_codes))
+                .order_by(Module.id)
+            ):
+                ids_by_code.setdefault(code, module_id)
+
         validated_modules = []
 
         for module_data in modules_data:
-            if module_data["code"].isdigit():
-                base_module = (
-                    self.db.query(Module)
-                    .filter(Module.id == module_data["code"])
-                    .first()
-                )
+            code = module_data["code"]
+            if code.isdigit():
+                base_module_id = int(code) if int(code) in existing_ids else None
             else:
-                base_module = (
-                    self.db.query(Module)
-                    .filter(Module.code == module_data["code"])
-                    .first()
-                )
+                base_module_id = ids_by_code.get(code)
 
-            if not base_module:
+            if base_module_id is None:
                 click.secho(
                     f"Warning: Module with code '{module_data['code']}' not found in database. Skipping.",
                     fg="yellow",
                 )
                 continue
 
-            module_data["base_module_id"] = base_module.id
+            module_data["base_module_id"] = base_module_id
             validated_modules.append(module_data)
 
         return validated_modules
@@ -73,36 +88,17 @@ class StructureDataProcessor:
         try:
             structure_info = structure_data.structure_info
 
-            structure = (
-                self.db.query(Structure)
-                .filter(Structure.id == int(structure_info["id"]))
-                .first()
-            )
-
-            if not structure:
-                structure = Structure(
-                    id=int(structure_info["id"]),
-                    code=structure_info["code"],
-                    desc=structure_info.get("desc", ""),
-                    program_id=program_id,
-                )
-                self.db.add(structure)
-            else:
-                structure.code = structure_info["code"]
-                structure.desc = structure_info.get("desc", "")
-                structure.program_id = program_id
-
-            self.db.flush()
+            structure_id = self._save_structure(structure_info, program_id)
+            self._save_semesters(structure_id, structure_data.semesters)
 
             for semester_data in structure_data.semesters:
-                semester = self._save_semester(structure, semester_data)
                 modules_data = structure_data.modules_by_semester.get(
                     semester_data["id"], []
                 )
 
                 if modules_data:
                     validated_modules = self.validate_and_process_modules(modules_data)
-                    self._save_modules(semester, validated_modules)
+                    self._save_modules(semester_data["id"], validated_modules)
 
             self.db.commit()
             return True
@@ -112,61 +108,84 @@ class StructureDataProcessor:
             click.secho(f"Error saving structure data: {str(e)}", fg="red")
             return False
 
-    def _save_semester(
-        self, structure: Structure, semester_data: Dict[str, Any]
-    ) -> StructureSemester:
-        """Save semester data."""
-        semester = (
-            self.db.query(StructureSemester)
-            .filter(StructureSemester.id == semester_data["id"])
-            .first()
+    def _save_structure(self, structure_info: Dict[str, str], program_id: int) -> int:
+        """Save structure data, returning the structure id."""
+        stmt = sqlite_insert(Structure).values(
+            id=int(structure_info["id"]),
+            code=structure_info["code"],
+            desc=structure_info.get("desc", ""),
+            program_id=program_id,
         )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Structure.id],
+            set_={
+                column: stmt.excluded[column]
+                for column in ("code", "desc", "program_id")
+            },
+        )
+        self.db.execute(stmt)
+        return int(structure_info["id"])
 
-        if not semester:
-            semester = StructureSemester(
-                id=semester_data["id"],
-                structure_id=structure.id,
-                name=semester_data["name"],
-                semester_number=semester_data["semester_number"],
-                total_credits=semester_data["total_credits"],
-            )
-            self.db.add(semester)
-        else:
-            semester.structure_id = structure.id
-            semester.name = semester_data["name"]
-            semester.semester_number = semester_data["semester_number"]
-            semester.total_credits = semester_data["total_credits"]
-
-        self.db.flush()
-        return semester
+    def _save_semesters(
+        self, structure_id: int, semesters_data: List[Dict[str, Any]]
+    ) -> None:
+        """Save all semesters of a structure."""
+        if not semesters_data:
+            return
+
+        stmt = sqlite_insert(StructureSemester).values(
+            [
+                {
+                    "id": semester_data["id"],
+                    "structure_id": structure_id,
+                    "name": semester_data["name"],
+                    "semester_number": semester_data["semester_number"],
+                    "total_credits": semester_data["total_credits"],
+                }
+                for semester_data in semesters_data
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StructureSemester.id],
+            set_={
+                column: stmt.excluded[column]
+                for column in (
+                    "structure_id",
+                    "name",
+                    "semester_number",
+                    "total_credits",
+                )
+            },
+        )
+        self.db.execute(stmt)
 
     def _save_modules(
-        self, semester: StructureSemester, modules_data: List[Dict[str, Any]]
+        self, semester_id: int, modules_data: List[Dict[str, Any]]
     ) -> None:
         """Save modules for a semester."""
-        for module_data in modules_data:
-            semester_module = (
-                self.db.query(SemesterModule)
-                .filter(SemesterModule.id == module_data["id"])
-                .first()
-            )
-
-            if not semester_module:
-                semester_module = SemesterModule(
-                    id=module_data["id"],
-                    module_id=module_data["base_module_id"],
-                    type=module_data["type"],
-                    credits=module_data["credits"],
-                    semester_id=semester.id,
-                )
-                self.db.add(semester_module)
-            else:
-                semester_module.module_id = module_data["base_module_id"]
-                semester_module.type = module_data["type"]
-                semester_module.credits = module_data["credits"]
-                semester_module.semester_id = semester.id
-
-        self.db.flush()
+        if not modules_data:
+            return
+
+        stmt = sqlite_insert(SemesterModule).values(
+            [
+                {
+                    "id": module_data["id"],
+                    "module_id": module_data["base_module_id"],
+                    "type": module_data["type"],
+                    "credits": module_data["credits"],
+                    "semester_id": semester_id,
+                }
+                for module_data in modules_data
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SemesterModule.id],
+            set_={
+                column: stmt.excluded[column]
+                for column in ("module_id", "type", "credits", "semester_id")
+            },
+        )
+        self.db.execute(stmt)
 
 
 class ConcurrentStructurePuller:
@@ -179,7 +198,7 @@ class ConcurrentStructurePuller:
 
     def pull_structures_for_program(self, program_id: int) -> None:
         """Pull all structures for a program with concurrent data fetching."""
-        program = self.db.query(Program).filter(Program.id == program_id).first()
+        program = self.db.get(Program, program_id)
         if not program:
             click.secho(
                 f"Program {program_id} not found in database. Pulling program data first...",
@@ -187,7 +206,7 @@ class ConcurrentStructurePuller:
             )
             school_id = click.prompt("Enter the school ID", type=int)
             program_pull(self.db, school_id=school_id)
-            program = self.db.query(Program).filter(Program.id == program_id).first()
+            program = self.db.get(Program, program_id)
             if not program:
                 click.secho(
                     f"Error: Program {program_id} not found after pulling programs. Please verify the program ID.",
@@ -245,9 +264,7 @@ class ConcurrentStructurePuller:
     def pull_single_structure(self, structure_id: int) -> None:
         """Pull a specific structure by its ID with concurrent data fetching."""
         try:
-            structure = (
-                self.db.query(Structure).filter(Structure.id == structure_id).first()
-            )
+            structure = self.db.get(Structure, structure_id)
 
             if not structure:
                 click.secho(
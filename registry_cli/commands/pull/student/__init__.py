@@ -37,9 +37,7 @@ def student_pull(db: Session, std_no: int, info_only: bool = False) -> bool:
     collector = ConcurrentStudentDataCollector()
 
     for prog in program_data:
-        program = (
-            db.query(StudentProgram).filter(StudentProgram.id == prog["id"]).first()
-        )
+        program = db.get(StudentProgram, prog["id"])
         if program:
             program.std_no = student.std_no
             for key, value in prog.items():
@@ -14,12 +14,18 @@ def scrape_and_save_modules(db: Session, semester: StudentSemester):
     """Scrape and save modules for a given semester."""
     module_scraper = StudentModuleScraper(semester.id)
     module_data = module_scraper.scrape()
+    save_modules(db, semester, module_data)
+    db.commit()
+    click.echo(f"Successfully saved modules for semester {semester.term}")
+    return module_data
+
+
+def save_modules(
+    db: Session, semester: StudentSemester, module_data: List[Dict[str, Any]]
+) -> None:
+    """Save already scraped modules for a semester without committing."""
     for mod in module_data:
-        semester_module = (
-            db.query(SemesterModule)
-            .filter(SemesterModule.id == mod["semester_module_id"])
-            .first()
-        )
+        semester_module = db.get(SemesterModule, mod["semester_module_id"])
         if not semester_module:
             click.secho(
                 f"SemesterModule with id: {mod['semester_module_id']} not found",
@@ -28,9 +34,7 @@ def scrape_and_save_modules(db: Session, semester: StudentSemester):
             raise RuntimeError(
                 f"SemesterModule with id: {mod['semester_module_id']} not found"
             )
-        existing_module = (
-            db.query(StudentModule).filter(StudentModule.id == mod["id"]).first()
-        )
+        existing_module = db.get(StudentModule, mod["id"])
         if existing_module:
             existing_module.status = mod["status"]
             existing_module.marks = mod["marks"]
@@ -47,9 +51,6 @@ def scrape_and_save_modules(db: Session, semester: StudentSemester):
                 semester=semester,
             )
             db.add(module)
-    db.commit()
-    click.echo(f"Successfully saved modules for semester {semester.term}")
-    return module_data
 
 
 def save_semesters_and_modules_batch(
@@ -83,11 +84,7 @@ def save_semesters_and_modules_batch(
     for semester_id, semester in saved_semesters.items():
         module_data = modules_by_semester.get(semester_id, [])
         for mod in module_data:
-            semester_module = (
-                db.query(SemesterModule)
-                .filter(SemesterModule.id == mod["semester_module_id"])
-                .first()
-            )
+            semester_module = db.get(SemesterModule, mod["semester_module_id"])
             if not semester_module:
                 logger.error(
                     f"SemesterModule with id: {mod['semester_module_id']} not found"
@@ -98,9 +95,7 @@ def save_semesters_and_modules_batch(
                 )
                 continue
 
-            existing_module = (
-                db.query(StudentModule).filter(StudentModule.id == mod["id"]).first()
-            )
+            existing_module = db.get(StudentModule, mod["id"])
             if existing_module:
                 existing_module.status = mod["status"]
                 existing_module.marks = mod["marks"]
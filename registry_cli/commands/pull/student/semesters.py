@@ -1,12 +1,13 @@
 from typing import Optional
 
 import click
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from registry_cli.models import Program, Structure, StudentProgram, StudentSemester
-from registry_cli.scrapers.student import StudentSemesterScraper
+from registry_cli.scrapers.student import StudentModuleScraper, StudentSemesterScraper
 
-from .common import scrape_and_save_modules
+from .common import save_modules
 
 
 def semesters_pull(
@@ -39,23 +40,46 @@ def semesters_pull(
         click.secho("No semesters found.", fg="red")
         return
 
-    db.query(StudentSemester).filter(
-        StudentSemester.student_program_id == program.id
-    ).delete()
-    db.commit()
-
+    # Scrape every semester's modules before writing anything, so the write
+    # transaction below is not held open across network requests
+    modules_by_semester = {}
     for sem in semester_data:
-        semester = StudentSemester(
-            id=sem["id"],
-            term=sem["term"],
-            status=sem["status"],
-            semester_number=sem["semester_number"],
-            student_program_id=program.id,
+        semester_id = int(sem["id"])
+        modules_by_semester[semester_id] = StudentModuleScraper(semester_id).scrape()
+
+    # Replace the program's semesters with a single executemany insert and
+    # save their modules, all in one short transaction that is committed once
+    try:
+        db.query(StudentSemester).filter(
+            StudentSemester.student_program_id == program.id
+        ).delete()
+        db.execute(
+            insert(StudentSemester),
+            [
+                {
+                    "id": int(sem["id"]),
+                    "term": sem["term"],
+                    "status": sem["status"],
+                    "semester_number": sem["semester_number"],
+                    "student_program_id": program.id,
+                }
+                for sem in semester_data
+            ],
         )
-        db.add(semester)
-        db.commit()
 
-        scrape_and_save_modules(db, semester)
+        semesters = {
+            semester.id: semester
+            for semester in db.query(StudentSemester).filter(
+                StudentSemester.student_program_id == program.id
+            )
+        }
+        for semester_id, module_data in modules_by_semester.items():
+            save_modules(db, semesters[semester_id], module_data)
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
 
     click.echo(
         f"Successfully pulled {len(semester_data)} semesters for student {std_no}"
@@ -15,6 +15,10 @@ TURSO_AUTH_TOKEN = os.getenv("TURSO_AUTH_TOKEN")
 
 
 TIMEOUT_SECONDS = 120
+# Room in the compiled statement cache for every distinct query the commands
+# build, and larger batches for multi-row INSERTs
+QUERY_CACHE_SIZE = 1200
+INSERTMANYVALUES_PAGE_SIZE = 5000
 
 
 def _register_hrana_exit(engine: Engine) -> None:
@@ -37,6 +41,8 @@ def get_engine(use_local: bool = True) -> Engine:
             "sqlite:///../registry-web/local.db",
             connect_args={"check_same_thread": False, "timeout": TIMEOUT_SECONDS},
             echo=False,
+            query_cache_size=QUERY_CACHE_SIZE,
+            insertmanyvalues_page_size=INSERTMANYVALUES_PAGE_SIZE,
             pool_pre_ping=True,
             poolclass=NullPool,
         )
@@ -50,6 +56,8 @@ def get_engine(use_local: bool = True) -> Engine:
                 f"sqlite+{url}",
                 connect_args={"check_same_thread": False, "timeout": TIMEOUT_SECONDS},
                 echo=False,
+                query_cache_size=QUERY_CACHE_SIZE,
+                insertmanyvalues_page_size=INSERTMANYVALUES_PAGE_SIZE,
                 pool_pre_ping=True,
                 poolclass=NullPool,
             )
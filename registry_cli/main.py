@@ -1,4 +1,5 @@
 import time
+from typing import Optional
 
 import click
 from sqlalchemy.orm import sessionmaker
@@ -926,8 +927,34 @@ def approved_graduation_clearance() -> None:
     default=False,
     help="Exclude students whose graduation request has been cleared (approved academic clearance)",
 )
+@click.option(
+    "--quiet",
+    is_flag=True,
+    default=False,
+    help="Skip the school and program breakdown in the console summary",
+)
+@click.option(
+    "--segment-by-school/--no-segment-by-school",
+    default=None,
+    help="Write each school's graduating students to a separate workbook "
+    "(default: only when there are more than 10000 graduating students)",
+)
+@click.option(
+    "--format",
+    "export_format",
+    type=click.Choice(["xlsx", "csv", "both"]),
+    default=None,
+    help="Write the Excel workbook, a plain CSV of graduating students, or both "
+    "(default: both when there are more than 5000 graduating students, else xlsx)",
+)
 def graduating_students(
-    graduation_year: int, completion_terms: str, levels: str, exclude_cleared: bool
+    graduation_year: int,
+    completion_terms: str,
+    levels: str,
+    exclude_cleared: bool,
+    quiet: bool,
+    segment_by_school: Optional[bool],
+    export_format: Optional[str],
 ) -> None:
     """Export graduating students to Excel file.
 
@@ -959,6 +986,9 @@ def graduating_students(
       registry export graduating-students 2025 -t 2025-02,2024-07 -l diploma,degree
       registry export graduating-students 2025 -t 2025-02 -l certificate,diploma,degree
       registry export graduating-students 2025 -t 2025-02 -l degree --exclude-cleared
+      registry export graduating-students 2025 -t 2025-02 -l degree --quiet
+      registry export graduating-students 2025 -t 2025-02 -l degree --segment-by-school
+      registry export graduating-students 2025 -t 2025-02 -l degree --format csv
     """
     db = get_db()
 
@@ -987,7 +1017,14 @@ def graduating_students(
     click.echo(f"Using program levels: {', '.join(levels_list)}")
 
     export_graduating_students(
-        db, graduation_year, terms_list, levels_list, exclude_cleared
+        db,
+        graduation_year,
+        terms_list,
+        levels_list,
+        exclude_cleared,
+        quiet,
+        segment_by_school,
+        export_format,
     )
 
 
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from bs4 import BeautifulSoup, Comment
 
@@ -13,9 +13,9 @@ class BaseScraper(ABC):
         self.url = url
         self.browser = Browser()
 
-    def _get_soup(self) -> BeautifulSoup:
-        """Get BeautifulSoup object from URL."""
-        response = self.browser.fetch(self.url)
+    def _get_soup(self, url: Optional[str] = None) -> BeautifulSoup:
+        """Get BeautifulSoup object from URL, defaulting to the scraper's URL."""
+        response = self.browser.fetch(url or self.url)
         soup = BeautifulSoup(response.text, "lxml")
         # Remove all HTML comments
         for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
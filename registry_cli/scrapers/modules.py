@@ -1,5 +1,6 @@
 import re
-from typing import Any, Dict, List
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
 from urllib.parse import urljoin
 
 from bs4 import BeautifulSoup
@@ -11,58 +12,74 @@ from registry_cli.scrapers.base import BaseScraper
 class ModuleScraper(BaseScraper):
     """Scraper for module data from the registry system."""
 
-    def __init__(self):
+    def __init__(self, max_workers: int = 8):
         super().__init__(f"{BASE_URL}/f_modulelist.php")
+        self.max_workers = max_workers
 
     def scrape(self):
         """Scrape modules from all pages of the registry system.
 
+        Pages are fetched concurrently as soon as the pager reveals them, but
+        are yielded in page order.
+
         Yields:
             List of dictionaries containing module data from each page.
         """
         total_modules = 0
-        current_page = 1
-        total_pages = 1
-
-        while current_page <= total_pages:
-            if current_page == 1:
-                url = f"{BASE_URL}/f_modulelist.php?start=1"
-            else:
-                start_index = (current_page - 1) * 10 + 1
-                url = f"{BASE_URL}/f_modulelist.php?start={start_index}"
-
-            self.url = url
-            soup = self._get_soup()
-
-            page_modules = self._parse_modules(soup)
-            total_modules += len(page_modules)
-
-            pager = soup.find("form", {"name": "ewpagerform"})
-            if pager:
-                page_links = pager.find_all("a", href=True)
-                if page_links:
-                    highest_page = 0
-                    for link in page_links:
-                        href = link.get("href", "")
-                        match = re.search(r"start=(\d+)", href)
-                        if match:
-                            start_idx = int(match.group(1))
-                            page_num = (start_idx - 1) // 10 + 1
-                            highest_page = max(highest_page, page_num)
-
-                    total_pages = max(total_pages, highest_page)
-
-            print(
-                f"Scraped page {current_page}/{total_pages}, found {len(page_modules)} modules"
-            )
-
-            # Yield modules from this page
-            yield page_modules
-
-            current_page += 1
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            page_modules, total_pages = self.fetch_page(1)
+            futures: Dict[int, Future] = {}
+            next_page = 2
+            current_page = 1
+
+            while True:
+                total_modules += len(page_modules)
+                print(
+                    f"Scraped page {current_page}/{total_pages}, found {len(page_modules)} modules"
+                )
+
+                # Queue up every page the pager has revealed so far
+                for page in range(next_page, total_pages + 1):
+                    futures[page] = executor.submit(self.fetch_page, page)
+                next_page = max(next_page, total_pages + 1)
+
+                # Yield modules from this page
+                yield page_modules
+
+                current_page += 1
+                if current_page > total_pages:
+                    break
+
+                page_modules, highest_page = futures.pop(current_page).result()
+                total_pages = max(total_pages, highest_page)
 
         print(f"Total modules scraped: {total_modules}")
 
+    def fetch_page(self, page: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Fetch and parse a single page of the module list.
+
+        Args:
+            page: Page number, starting at 1.
+
+        Returns:
+            The modules on the page, and the highest page number in its pager.
+        """
+        start_index = (page - 1) * 10 + 1
+        soup = self._get_soup(f"{BASE_URL}/f_modulelist.php?start={start_index}")
+
+        highest_page = page
+        pager = soup.find("form", {"name": "ewpagerform"})
+        if pager:
+            for link in pager.find_all("a", href=True):
+                href = link.get("href", "")
+                match = re.search(r"start=(\d+)", href)
+                if match:
+                    start_idx = int(match.group(1))
+                    highest_page = max(highest_page, (start_idx - 1) // 10 + 1)
+
+        return self._parse_modules(soup), highest_page
+
     def _parse_modules(self, soup: BeautifulSoup) -> List[Dict[str, Any]]:
         """Parse modules from the HTML soup object.
 
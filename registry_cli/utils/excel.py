@@ -0,0 +1,52 @@
+from typing import Optional, Sequence
+
+import click
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.xml import LXML
+
+# openpyxl styles are immutable, so one instance can be shared by every cell
+BOLD_WHITE = Font(bold=True, color="FFFFFF")
+BOLD_GREY = Font(bold=True, color="444444")
+GREY_FILL = PatternFill(start_color="444444", end_color="444444", fill_type="solid")
+BLACK_FILL = PatternFill(start_color="000000", end_color="000000", fill_type="solid")
+BLUE_FILL = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+
+
+def column_width(header: str, values: Sequence) -> int:
+    """
+    Number of characters needed by a header and its column of values.
+
+    Write-only sheets emit column widths before the first row, so exporters
+    work the widths out from all of a sheet's rows before appending any.
+
+    The values must all be strings or all be non-negative integers; the
+    widest integer is the largest, so only it is converted to a string.
+    """
+    if values and isinstance(values[0], int):
+        return max(len(header), len(str(max(values))))
+    return max(len(header), max(map(len, values), default=0))
+
+
+def styled_cell(
+    ws, value, font: Font, fill: Optional[PatternFill] = None
+) -> WriteOnlyCell:
+    """Create a styled cell for appending to a write-only worksheet."""
+    cell = WriteOnlyCell(ws, value=value)
+    cell.font = font
+    if fill is not None:
+        cell.fill = fill
+    return cell
+
+
+def warn_if_no_lxml() -> None:
+    """
+    Warn that Excel exports will be slow when lxml is not installed.
+
+    openpyxl streams write-only sheets through lxml when it is available and
+    falls back to the much slower standard library XML writer otherwise.
+    """
+    if not LXML:
+        click.secho(
+            "Warning: lxml is not installed, Excel export will be slower", fg="yellow"
+        )